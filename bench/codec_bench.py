@@ -0,0 +1,124 @@
+"""
+Compares the wire codecs ExecClient can select on representative traffic.
+
+Runs outside TouchDesigner:
+
+    python bench/codec_bench.py
+    python bench/codec_bench.py --targets 2000 --recorded capture.jsonl
+
+Without recordings, sync batches and CompactBatchTargetAction commands are
+synthesized from the real exec/myko item classes. Recordings are files with
+one raw websocket message per line.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py', 'mod'))
+
+from codec import availableCodecs  # noqa: E402
+from exec import Action, Emitter, Target  # noqa: E402
+from myko import ENVELOPE, MEvent, MEventType, WSEventBatch  # noqa: E402
+
+
+def buildSyncBatch(numTargets: int) -> dict:
+	events = []
+	with ENVELOPE.batch():
+		for i in range(numTargets):
+			targetId = f"target-{i}"
+			properties = {
+				f"Par{p}": {
+					"type": "object",
+					"properties": {"value": {"type": "number"}},
+				}
+				for p in range(8)
+			}
+			target = Target(targetId, f"Target {i}", ["parent"], "show", "Float")
+			action = Action(
+				f"{targetId}:bulk_set",
+				"Bulk Set",
+				targetId,
+				"show",
+				{"type": "object", "properties": properties},
+				None,
+				schemaLayout=[{"path": f"Par{p}", "label": f"Par {p}", "section": "Main"} for p in range(8)],
+			)
+			emitter = Emitter(f"{targetId}:updated", "Updated", targetId, "show", {"type": "object", "properties": properties}, "", None)
+			for item in (target, action, emitter):
+				events.append(MEvent(changeType=MEventType.SET, item=item))
+	return WSEventBatch(events).__dict__
+
+
+def buildCompactBatch(numTargets: int) -> dict:
+	return {
+		"event": "ws:m:command",
+		"data": {
+			"commandId": "CompactBatchTargetAction",
+			"command": {
+				"tx": ENVELOPE.nextTx(),
+				"createdAt": ENVELOPE.timestamp(),
+				"groups": [
+					{
+						"actionId": "shared:bulk_set",
+						"payloads": [{f"Par{p}": {"value": p * 0.5} for p in range(8)} for _ in range(4)],
+						"assignments": [
+							{"instanceId": "machine:show", "targetId": f"target-{i}", "payloadIndex": i % 4}
+							for i in range(numTargets)
+						],
+					}
+				],
+			},
+		},
+	}
+
+
+def loadRecorded(paths):
+	messages = []
+	for path in paths:
+		with open(path, 'r', encoding='utf-8') as f:
+			messages.extend(line.strip() for line in f if line.strip())
+	return messages
+
+
+def timeIt(fn, repeat: int) -> float:
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--targets', type=int, default=1000)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--recorded', nargs='*', default=[])
+	args = parser.parse_args()
+
+	codecs = availableCodecs()
+	reference = codecs[-1]
+
+	samples = {
+		'sync batch': buildSyncBatch(args.targets),
+		'compact batch': buildCompactBatch(args.targets),
+	}
+	recorded = loadRecorded(args.recorded)
+	if recorded:
+		samples['recorded'] = [reference.decode(message) for message in recorded]
+
+	print(f"codecs: {', '.join(codec.name for codec in codecs)}")
+	print(f"{'sample':<16}{'codec':<10}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+	for sampleName, payload in samples.items():
+		payloads = payload if isinstance(payload, list) else [payload]
+		for codec in codecs:
+			encoded = [codec.encode(p) for p in payloads]
+			size = sum(len(e.encode('utf-8')) for e in encoded)
+			encodeTime = timeIt(lambda: [codec.encode(p) for p in payloads], args.repeat)
+			decodeTime = timeIt(lambda: [codec.decode(e) for e in encoded], args.repeat)
+			print(f"{sampleName:<16}{codec.name:<10}{size:>12}{encodeTime * 1000:>12.2f}{decodeTime * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,139 @@
+"""
+Runs ExecClient against a local stand-in server and reports, per message
+class, the wire size and CPU cost of JSON versus MessagePack framing.
+
+    python bench/protocol_bench.py
+    python bench/protocol_bench.py --targets 2000 --sequence-blocks 512
+
+The stand-in server answers the ws:m:protocol offer with a protocol-ack,
+records every frame it receives and pushes commands back through
+parseMessage/parseBinaryMessage, so both directions go through the same
+dispatch as in TouchDesigner. Requires msgpack to be importable.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py', 'mod'))
+
+from codec import JsonCodec, selectBinaryCodec  # noqa: E402
+from exec import Action, ExecClient  # noqa: E402
+
+from codec_bench import buildCompactBatch, buildSyncBatch  # noqa: E402
+
+
+class StandInServer:
+	def __init__(self, client: ExecClient, binary: bool):
+		self.client = client
+		self.binary = binary
+		self.json = JsonCodec()
+		self.msgpack = selectBinaryCodec()
+		self.received = defaultdict(list)
+		self.messageClass = None
+
+	def receiveText(self, message: str):
+		payload = self.json.decode(message)
+		if payload.get('event') == 'ws:m:protocol':
+			codec = 'msgpack' if self.binary and 'msgpack' in payload['data']['codecs'] else 'json'
+			self.client.parseMessage(self.json.encode({'event': 'ws:m:protocol-ack', 'data': {'codec': codec}}))
+			return
+		self.received[self.messageClass].append(len(message.encode('utf-8')))
+
+	def receiveBinary(self, message: bytes):
+		self.msgpack.decode(message)
+		self.received[self.messageClass].append(len(message))
+
+	def pushCommand(self, payload: dict):
+		if self.client.binaryProtocol:
+			self.client.parseBinaryMessage(self.msgpack.encode(payload))
+		else:
+			self.client.parseMessage(self.json.encode(payload))
+
+
+def buildClient(binary: bool):
+	client = ExecClient()
+	client.log = lambda message: None
+	server = StandInServer(client, binary)
+	client.setSend(server.receiveText)
+	client.setSendBinary(server.receiveBinary)
+	client.requestBinaryProtocol()
+	assert client.binaryProtocol == binary, 'protocol negotiation failed'
+	return client, server
+
+
+def runScenario(binary: bool, args) -> dict:
+	client, server = buildClient(binary)
+
+	server.messageClass = 'sync batch'
+	client._sendPayload(buildSyncBatch(args.targets))
+
+	server.messageClass = 'pulse batch'
+	client.pulseBatchSize = args.targets
+	for i in range(args.targets):
+		client.pulseEmitter(f"target-{i}:updated", {'value': i * 0.25})
+	client.flushPulses()
+
+	server.messageClass = 'sequence pulse'
+	client.pulseEmitter('sequence:updated', [{'x': i * 0.1, 'y': i * 0.2, 'z': i * 0.3} for i in range(args.sequence_blocks)])
+	client.flushPulses()
+
+	server.messageClass = 'command response'
+	client.actions['shared:bulk_set'] = Action('shared:bulk_set', 'Bulk Set', 'target-0', 'show', None, None)
+	client.handlers['shared:bulk_set'] = lambda action, data: None
+	server.pushCommand(buildCompactBatch(args.targets))
+
+	return {messageClass: sum(sizes) for messageClass, sizes in server.received.items()}
+
+
+def cpuCost(codec, payload, repeat: int):
+	encoded = codec.encode(payload)
+	start = time.perf_counter()
+	for _ in range(repeat):
+		codec.encode(payload)
+	encodeTime = (time.perf_counter() - start) / repeat
+	start = time.perf_counter()
+	for _ in range(repeat):
+		codec.decode(encoded)
+	decodeTime = (time.perf_counter() - start) / repeat
+	return encodeTime, decodeTime
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--targets', type=int, default=1000)
+	parser.add_argument('--sequence-blocks', type=int, default=256)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	msgpackCodec = selectBinaryCodec()
+	if msgpackCodec is None:
+		print('msgpack is not installed, nothing to compare')
+		return
+
+	jsonSizes = runScenario(False, args)
+	binarySizes = runScenario(True, args)
+
+	print(f"{'message class':<18}{'json B':>12}{'msgpack B':>12}{'saved':>8}")
+	for messageClass, jsonSize in jsonSizes.items():
+		binarySize = binarySizes.get(messageClass, 0)
+		saved = 1 - binarySize / jsonSize if jsonSize else 0
+		print(f"{messageClass:<18}{jsonSize:>12}{binarySize:>12}{saved:>8.1%}")
+
+	jsonCodec = JsonCodec()
+	samples = {
+		'sync batch': buildSyncBatch(args.targets),
+		'compact batch': buildCompactBatch(args.targets),
+		'sequence pulse': [{'x': i * 0.1, 'y': i * 0.2, 'z': i * 0.3} for i in range(args.sequence_blocks)],
+	}
+	print()
+	print(f"{'message class':<18}{'codec':<10}{'encode ms':>12}{'decode ms':>12}")
+	for messageClass, payload in samples.items():
+		for codec in (jsonCodec, msgpackCodec):
+			encodeTime, decodeTime = cpuCost(codec, payload, args.repeat)
+			print(f"{messageClass:<18}{codec.name:<10}{encodeTime * 1000:>12.3f}{decodeTime * 1000:>12.3f}")
+
+
+if __name__ == '__main__':
+	main()
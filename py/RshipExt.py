@@ -8,14 +8,24 @@ can be accessed externally, e.g. op('yourComp').PromotedFunction().
 Help: search "Extensions" in wiki
 """
 import datetime
-from typing import Dict, Set, Callable
+import time
+from typing import Dict, List, Set, Callable
 from enum import Enum
 
 import TDFunctions as TDF
 import socket
-from exec import CLIENT, ExecClient, GetActionsByQuery, GetEmittersByQuery, GetTargetsByQuery, Instance, Machine, InstanceStatus, Status, Action, Emitter
-from myko import QueryResponse
-from op_target import OPTarget
+from exec import CLIENT, ExecClient, GetActionsByQuery, GetEmittersByQuery, GetTargetsByQuery, Instance, Machine, InstanceStatus, Status, Action, Emitter, Target
+from myko import ENVELOPE, QueryError, QueryResponse
+from op_target import OPTarget, structuralFingerprint
+from par_shape import SCHEMA_CACHE
+from par_writes import PAR_WRITES
+from command_queue import OVERFLOW_DROP_OLDEST, OVERFLOW_POLICIES
+from pulse import PulseRateLimiter
+from remote_mirror import MirrorUpdate, RemoteMirror
+from scheduler import FrameScheduler, runSteps
+from subscriptions import QUERY, REPORT
+from sync import ProjectSync
+from timing import PHASE_TIMER, PHASES
 import json
 
 from target import TouchTarget
@@ -57,6 +67,71 @@ class RshipExt:
 	REMOTE_TARGETS_PAR = 'Remotetargets'
 	REMOTE_ACTIONS_PAR = 'Remoteactions'
 	REMOTE_EMITTERS_PAR = 'Remoteemitters'
+	SCHEMA_CACHE_HITS_PAR = 'Schemacachehits'
+	SCHEMA_CACHE_MISSES_PAR = 'Schemacachemisses'
+	PULSES_SENT_PAR = 'Pulsessent'
+	PULSES_SUPPRESSED_PAR = 'Pulsessuppressed'
+	OVERSIZED_EVENTS_PAR = 'Oversizedevents'
+	COLLAPSED_WRITES_PAR = 'Collapsedwrites'
+	COMMAND_QUEUE_DEPTH_PAR = 'Commandqueuedepth'
+	COMMANDS_COLLAPSED_PAR = 'Commandscollapsed'
+	COMMANDS_DROPPED_PAR = 'Commandsdropped'
+	COMMAND_WAIT_PAR = 'Commandwaitms'
+	COMMAND_MAX_WAIT_PAR = 'Commandmaxwaitms'
+	OUTBOUND_BACKLOG_PAR = 'Outboundbacklog'
+	OUTBOUND_BACKLOG_EVENTS_PAR = 'Outboundbacklogevents'
+	ACTIVE_QUERIES_PAR = 'Activequeries'
+	PENDING_REPORTS_PAR = 'Pendingreports'
+	REGISTERED_ACTIONS_PAR = 'Registeredactions'
+	REGISTERED_HANDLERS_PAR = 'Registeredhandlers'
+	EMITTER_KEYS_PAR = 'Emitterkeys'
+	TRACKED_STATUSES_PAR = 'Trackedstatuses'
+	SWEPT_ENTRIES_PAR = 'Sweptentries'
+	SYNC_STATE_PAR = 'Syncstate'
+	SYNC_PROGRESS_PAR = 'Syncprogress'
+	OUT_MESSAGES_RATE_PAR = 'Outmessagesrate'
+	OUT_BYTES_RATE_PAR = 'Outbytesrate'
+	OUT_LARGEST_PAR = 'Outlargest'
+	IN_MESSAGES_RATE_PAR = 'Inmessagesrate'
+	IN_BYTES_RATE_PAR = 'Inbytesrate'
+	IN_LARGEST_PAR = 'Inlargest'
+	ACTIONS_TRACED_PAR = 'Actionstraced'
+	LATENCY_P50_PAR = 'Latencyp50ms'
+	LATENCY_P95_PAR = 'Latencyp95ms'
+	LATENCY_P99_PAR = 'Latencyp99ms'
+	TRANSIT_P95_PAR = 'Transitp95ms'
+	QUEUE_P95_PAR = 'Queuep95ms'
+	HANDLER_P95_PAR = 'Handlerp95ms'
+	CLOCK_OFFSET_PAR = 'Clockoffsetms'
+	# Per-phase refresh timings, e.g. Cookms, Cookmeanms and Cookp95ms
+	PHASE_TIMINGS_DAT = 'phase_timings'
+	# Traffic per direction and message kind, refreshed every tick
+	TRAFFIC_DAT = 'traffic'
+	# Action latency percentiles per action type and stage, refreshed every tick
+	ACTION_LATENCY_DAT = 'action_latency'
+
+	CONFIG_PAGE = 'Rship Performance'
+	EMITTER_MAX_RATE_PAR = 'Emittermaxrate'
+	PULSE_BATCH_SIZE_PAR = 'Pulsebatchsize'
+	BINARY_PROTOCOL_PAR = 'Binaryprotocol'
+	SYNC_MAX_KB_PAR = 'Syncmaxkb'
+	SYNC_MAX_EVENTS_PAR = 'Syncmaxevents'
+	REFRESH_BUDGET_PAR = 'Refreshbudgetms'
+	COMBINE_WRITES_PAR = 'Combineparwrites'
+	COMMAND_BUDGET_PAR = 'Commandbudgetms'
+	COMMAND_QUEUE_MAX_PAR = 'Commandqueuemax'
+	COMMAND_OVERFLOW_PAR = 'Commandoverflow'
+	THREADED_DECODE_PAR = 'Threadeddecode'
+	THREADED_ENCODE_PAR = 'Threadedencode'
+	PHASE_TIMING_PAR = 'Phasetiming'
+	LATENCY_TRACING_PAR = 'Latencytracing'
+	ECHO_LATENCY_PAR = 'Echolatency'
+
+	REFRESH_JOB = 'refresh'
+	# Items hashed or events built between scheduler yields
+	SYNC_STEP_SIZE = 250
+	# Seconds without a Frame Start callback before deferred work falls back to inline
+	FRAME_HOOK_TIMEOUT = 1.0
 
 	def __init__(self, ownerComp):
 		self.ownerComp = ownerComp
@@ -68,8 +143,12 @@ class RshipExt:
 		self.targetsOp = self.ownerComp.op('path_and_pars')
 
 		self.streamSourcesOp = self.ownerComp.op('stream_sources')
+
+		self._lastFrameHookAt: float | None = None
+		self._frameHooksWarned = False
 		
 		CLIENT.setSend(self.websocketOp.sendText)
+		op.RS_LOG.Info(f"[RshipExt]: Using {CLIENT.codec.name} wire codec")
 
 		TDF.createProperty(self, 'MachineId', value=None, dependable=True,
 						   readOnly=False)
@@ -92,13 +171,24 @@ class RshipExt:
 
 		self.emitterIndex: Dict[str, Emitter] = {}
 		self.emitterHandlers: Dict[str, Callable] = {}
+		self.rateLimiter = PulseRateLimiter()
+		self.scheduler = FrameScheduler()
+		self._refreshCallbacks: List[Callable[[], None]] = []
+		self._refreshSendEmitterValues = False
+		self._lastSyncDescription = None
 
 		self.reconnectTimerOp = self.ownerComp.op('reconnect_timer')
 
 		self.reconnectTimerOp.par.start.pulse()
 
-		self.remoteKeys: Set[str] = set()
-		self.sentTargetStatuses: Dict[str, Status] = {}  # Track which statuses we've sent
+		# Remote items for our serviceId, kept current from live query responses
+		self.remoteTargets = RemoteMirror("Target")
+		self.remoteActions = RemoteMirror("Action")
+		self.remoteEmitters = RemoteMirror("Emitter")
+		self.sync = ProjectSync()
+		self.sentTargetStatuses: Dict[str, Status] = self.sync.targetStatuses  # Track which statuses we've sent
+		# Registry entries dropped because a newer build no longer had them
+		self.sweptEntries = 0
 		self.execInfoFailureLogged = False
 		self.remoteStats = {
 			'targets': 0,
@@ -107,6 +197,8 @@ class RshipExt:
 		}
 
 		self.ensureStatsPars()
+		self.ensureConfigPars()
+		self.applyConfigPars()
 		self.updateStatsPage(localTargets=0, localActions=0, localEmitters=0)
 
 	
@@ -126,6 +218,27 @@ class RshipExt:
 			(self.REMOTE_TARGETS_PAR, 'Remote Targets'),
 			(self.REMOTE_ACTIONS_PAR, 'Remote Actions'),
 			(self.REMOTE_EMITTERS_PAR, 'Remote Emitters'),
+			(self.SCHEMA_CACHE_HITS_PAR, 'Schema Cache Hits'),
+			(self.SCHEMA_CACHE_MISSES_PAR, 'Schema Cache Misses'),
+			(self.PULSES_SENT_PAR, 'Pulses Sent'),
+			(self.PULSES_SUPPRESSED_PAR, 'Pulses Suppressed'),
+			(self.OVERSIZED_EVENTS_PAR, 'Oversized Events'),
+			(self.COLLAPSED_WRITES_PAR, 'Collapsed Par Writes'),
+			(self.COMMAND_QUEUE_DEPTH_PAR, 'Command Queue Depth'),
+			(self.COMMANDS_COLLAPSED_PAR, 'Commands Collapsed'),
+			(self.COMMANDS_DROPPED_PAR, 'Commands Dropped'),
+			(self.OUTBOUND_BACKLOG_PAR, 'Outbound Backlog'),
+			(self.OUTBOUND_BACKLOG_EVENTS_PAR, 'Outbound Backlog Events'),
+			(self.ACTIVE_QUERIES_PAR, 'Active Queries'),
+			(self.PENDING_REPORTS_PAR, 'Pending Reports'),
+			(self.REGISTERED_ACTIONS_PAR, 'Registered Actions'),
+			(self.REGISTERED_HANDLERS_PAR, 'Registered Handlers'),
+			(self.EMITTER_KEYS_PAR, 'Emitter Keys'),
+			(self.TRACKED_STATUSES_PAR, 'Tracked Statuses'),
+			(self.SWEPT_ENTRIES_PAR, 'Swept Entries'),
+			(self.OUT_LARGEST_PAR, 'Largest Sent (bytes)'),
+			(self.IN_LARGEST_PAR, 'Largest Received (bytes)'),
+			(self.ACTIONS_TRACED_PAR, 'Actions Traced'),
 		]
 
 		for parName, label in parNames:
@@ -134,6 +247,42 @@ class RshipExt:
 			par = self.ownerComp.par[parName]
 			par.readOnly = True
 
+		if self.SYNC_STATE_PAR not in page.pars:
+			page.appendStr(self.SYNC_STATE_PAR, label='Sync State')
+		if self.SYNC_PROGRESS_PAR not in page.pars:
+			page.appendFloat(self.SYNC_PROGRESS_PAR, label='Sync Progress')
+		self.ownerComp.par[self.SYNC_STATE_PAR].readOnly = True
+		self.ownerComp.par[self.SYNC_PROGRESS_PAR].readOnly = True
+
+		timingPars = []
+		for phase in PHASES:
+			label = phase.capitalize()
+			timingPars.extend((
+				(self.phaseParName(phase, ''), f'{label} (ms)'),
+				(self.phaseParName(phase, 'mean'), f'{label} Mean (ms)'),
+				(self.phaseParName(phase, 'p95'), f'{label} P95 (ms)'),
+			))
+
+		floatPars = [
+			(self.COMMAND_WAIT_PAR, 'Command Wait (ms)'),
+			(self.COMMAND_MAX_WAIT_PAR, 'Command Max Wait (ms)'),
+			(self.OUT_MESSAGES_RATE_PAR, 'Sent Messages/s'),
+			(self.OUT_BYTES_RATE_PAR, 'Sent Bytes/s'),
+			(self.IN_MESSAGES_RATE_PAR, 'Received Messages/s'),
+			(self.IN_BYTES_RATE_PAR, 'Received Bytes/s'),
+			(self.LATENCY_P50_PAR, 'Action Latency P50 (ms)'),
+			(self.LATENCY_P95_PAR, 'Action Latency P95 (ms)'),
+			(self.LATENCY_P99_PAR, 'Action Latency P99 (ms)'),
+			(self.TRANSIT_P95_PAR, 'Transit P95 (ms)'),
+			(self.QUEUE_P95_PAR, 'Receive to Dispatch P95 (ms)'),
+			(self.HANDLER_P95_PAR, 'Handler P95 (ms)'),
+			(self.CLOCK_OFFSET_PAR, 'Clock Offset (ms)'),
+		] + timingPars
+		for parName, label in floatPars:
+			if parName not in page.pars:
+				page.appendFloat(parName, label=label)
+			self.ownerComp.par[parName].readOnly = True
+
 		page.sort(
 			self.LOCAL_TARGETS_PAR,
 			self.LOCAL_ACTIONS_PAR,
@@ -141,8 +290,189 @@ class RshipExt:
 			self.REMOTE_TARGETS_PAR,
 			self.REMOTE_ACTIONS_PAR,
 			self.REMOTE_EMITTERS_PAR,
+			self.SCHEMA_CACHE_HITS_PAR,
+			self.SCHEMA_CACHE_MISSES_PAR,
+			self.PULSES_SENT_PAR,
+			self.PULSES_SUPPRESSED_PAR,
+			self.OVERSIZED_EVENTS_PAR,
+			self.COLLAPSED_WRITES_PAR,
+			self.COMMAND_QUEUE_DEPTH_PAR,
+			self.COMMAND_WAIT_PAR,
+			self.COMMAND_MAX_WAIT_PAR,
+			self.COMMANDS_COLLAPSED_PAR,
+			self.COMMANDS_DROPPED_PAR,
+			self.OUTBOUND_BACKLOG_PAR,
+			self.OUTBOUND_BACKLOG_EVENTS_PAR,
+			self.ACTIVE_QUERIES_PAR,
+			self.PENDING_REPORTS_PAR,
+			self.REGISTERED_ACTIONS_PAR,
+			self.REGISTERED_HANDLERS_PAR,
+			self.EMITTER_KEYS_PAR,
+			self.TRACKED_STATUSES_PAR,
+			self.SWEPT_ENTRIES_PAR,
+			self.OUT_MESSAGES_RATE_PAR,
+			self.OUT_BYTES_RATE_PAR,
+			self.OUT_LARGEST_PAR,
+			self.IN_MESSAGES_RATE_PAR,
+			self.IN_BYTES_RATE_PAR,
+			self.IN_LARGEST_PAR,
+			self.ACTIONS_TRACED_PAR,
+			self.LATENCY_P50_PAR,
+			self.LATENCY_P95_PAR,
+			self.LATENCY_P99_PAR,
+			self.TRANSIT_P95_PAR,
+			self.QUEUE_P95_PAR,
+			self.HANDLER_P95_PAR,
+			self.CLOCK_OFFSET_PAR,
+			self.SYNC_STATE_PAR,
+			self.SYNC_PROGRESS_PAR,
+			*[parName for parName, _ in timingPars],
 		)
 		self.ownerComp.par[self.REMOTE_TARGETS_PAR].startSection = True
+		self.ownerComp.par[self.SCHEMA_CACHE_HITS_PAR].startSection = True
+		self.ownerComp.par[self.PULSES_SENT_PAR].startSection = True
+		self.ownerComp.par[self.COMMAND_QUEUE_DEPTH_PAR].startSection = True
+		self.ownerComp.par[self.OUTBOUND_BACKLOG_PAR].startSection = True
+		self.ownerComp.par[self.ACTIVE_QUERIES_PAR].startSection = True
+		self.ownerComp.par[self.REGISTERED_ACTIONS_PAR].startSection = True
+		self.ownerComp.par[self.OUT_MESSAGES_RATE_PAR].startSection = True
+		self.ownerComp.par[self.ACTIONS_TRACED_PAR].startSection = True
+		self.ownerComp.par[self.SYNC_STATE_PAR].startSection = True
+		self.ownerComp.par[timingPars[0][0]].startSection = True
+
+	def phaseParName(self, phase: str, stat: str) -> str:
+		return f'{phase.capitalize()}{stat}ms'
+
+	def ensureConfigPars(self):
+		if self.CONFIG_PAGE not in self.ownerComp.customPages:
+			self.ownerComp.appendCustomPage(self.CONFIG_PAGE)
+
+		page = self.ownerComp.customPages[self.CONFIG_PAGE]
+
+		if self.EMITTER_MAX_RATE_PAR not in page.pars:
+			maxRatePar = page.appendFloat(self.EMITTER_MAX_RATE_PAR, label='Emitter Max Rate (Hz)')[0]
+			maxRatePar.default = 0
+			maxRatePar.val = 0
+			maxRatePar.min = 0
+			maxRatePar.clampMin = True
+			maxRatePar.normMax = 60
+			maxRatePar.help = 'Default max pulses per second per emitter. 0 disables rate limiting.'
+
+		if self.PULSE_BATCH_SIZE_PAR not in page.pars:
+			batchSizePar = page.appendInt(self.PULSE_BATCH_SIZE_PAR, label='Pulse Batch Size')[0]
+			batchSizePar.default = 200
+			batchSizePar.val = 200
+			batchSizePar.min = 0
+			batchSizePar.clampMin = True
+			batchSizePar.normMax = 1000
+			batchSizePar.help = 'Max pulses per event-batch flushed at frame end. 0 sends each pulse immediately.'
+
+		if self.BINARY_PROTOCOL_PAR not in page.pars:
+			binaryPar = page.appendToggle(self.BINARY_PROTOCOL_PAR, label='Binary Protocol (MessagePack)')[0]
+			binaryPar.default = False
+			binaryPar.help = 'Offer MessagePack framing on connect. Stays on JSON unless the server accepts.'
+
+		if self.SYNC_MAX_KB_PAR not in page.pars:
+			maxKbPar = page.appendInt(self.SYNC_MAX_KB_PAR, label='Sync Max KB per Message')[0]
+			maxKbPar.default = 512
+			maxKbPar.val = 512
+			maxKbPar.min = 0
+			maxKbPar.clampMin = True
+			maxKbPar.normMax = 4096
+			maxKbPar.help = 'Event batches are split so no message exceeds this size. 0 disables the limit.'
+
+		if self.SYNC_MAX_EVENTS_PAR not in page.pars:
+			maxEventsPar = page.appendInt(self.SYNC_MAX_EVENTS_PAR, label='Sync Max Events per Message')[0]
+			maxEventsPar.default = 2000
+			maxEventsPar.val = 2000
+			maxEventsPar.min = 0
+			maxEventsPar.clampMin = True
+			maxEventsPar.normMax = 10000
+			maxEventsPar.help = 'Event batches are split so no message has more events than this. 0 disables the limit.'
+
+		if self.REFRESH_BUDGET_PAR not in page.pars:
+			budgetPar = page.appendFloat(self.REFRESH_BUDGET_PAR, label='Refresh Budget (ms/frame)')[0]
+			budgetPar.default = 4
+			budgetPar.val = 4
+			budgetPar.min = 0
+			budgetPar.clampMin = True
+			budgetPar.normMax = 16
+			budgetPar.help = 'Time per frame spent rebuilding and syncing targets. 0 runs the whole refresh in one frame.'
+
+		if self.COMBINE_WRITES_PAR not in page.pars:
+			combinePar = page.appendToggle(self.COMBINE_WRITES_PAR, label='Combine Par Writes')[0]
+			combinePar.default = False
+			combinePar.help = 'Buffer par sets from actions and apply only the last value per par once per frame.'
+
+		if self.COMMAND_BUDGET_PAR not in page.pars:
+			commandBudgetPar = page.appendFloat(self.COMMAND_BUDGET_PAR, label='Command Budget (ms/frame)')[0]
+			commandBudgetPar.default = 4
+			commandBudgetPar.val = 4
+			commandBudgetPar.min = 0
+			commandBudgetPar.clampMin = True
+			commandBudgetPar.normMax = 16
+			commandBudgetPar.help = 'Time per frame spent running queued commands at frame start. 0 runs commands as they arrive.'
+
+		if self.COMMAND_QUEUE_MAX_PAR not in page.pars:
+			queueMaxPar = page.appendInt(self.COMMAND_QUEUE_MAX_PAR, label='Command Queue Max')[0]
+			queueMaxPar.default = 1000
+			queueMaxPar.val = 1000
+			queueMaxPar.min = 0
+			queueMaxPar.clampMin = True
+			queueMaxPar.normMax = 10000
+			queueMaxPar.help = 'Max queued commands before the overflow policy applies. 0 disables the limit.'
+
+		if self.COMMAND_OVERFLOW_PAR not in page.pars:
+			overflowPar = page.appendMenu(self.COMMAND_OVERFLOW_PAR, label='Command Overflow')[0]
+			overflowPar.menuNames = list(OVERFLOW_POLICIES)
+			overflowPar.menuLabels = ['Drop Oldest', 'Reject Newest']
+			overflowPar.default = OVERFLOW_DROP_OLDEST
+			overflowPar.help = 'What to do with commands that arrive while the queue is full.'
+
+		if self.THREADED_DECODE_PAR not in page.pars:
+			decodePar = page.appendToggle(self.THREADED_DECODE_PAR, label='Decode Off Main Thread')[0]
+			decodePar.default = True
+			decodePar.val = True
+			decodePar.help = 'Decode large inbound messages on a worker thread. Dispatch stays on the main thread, in order.'
+
+		if self.THREADED_ENCODE_PAR not in page.pars:
+			encodePar = page.appendToggle(self.THREADED_ENCODE_PAR, label='Encode Off Main Thread')[0]
+			encodePar.default = False
+			encodePar.help = 'Serialize outbound messages on a worker thread; finished messages are sent at frame start and end, in order.'
+
+		if self.PHASE_TIMING_PAR not in page.pars:
+			timingPar = page.appendToggle(self.PHASE_TIMING_PAR, label='Phase Timing')[0]
+			timingPar.default = False
+			timingPar.help = 'Time each refresh phase and publish last, mean and p95 on the stats page and in the phase_timings DAT.'
+
+		if self.LATENCY_TRACING_PAR not in page.pars:
+			tracingPar = page.appendToggle(self.LATENCY_TRACING_PAR, label='Action Latency Tracing')[0]
+			tracingPar.default = True
+			tracingPar.val = True
+			tracingPar.help = 'Measure each target action from server createdAt to handler completion, per action type.'
+
+		if self.ECHO_LATENCY_PAR not in page.pars:
+			echoPar = page.appendToggle(self.ECHO_LATENCY_PAR, label='Echo Latency in Responses')[0]
+			echoPar.default = False
+			echoPar.help = 'Add the measured latency stages to command responses as latency, in ms.'
+
+	def applyConfigPars(self):
+		self.rateLimiter.defaultRate = float(self.ownerComp.par[self.EMITTER_MAX_RATE_PAR].eval())
+		CLIENT.pulseBatchSize = int(self.ownerComp.par[self.PULSE_BATCH_SIZE_PAR].eval())
+		CLIENT.maxBatchBytes = int(self.ownerComp.par[self.SYNC_MAX_KB_PAR].eval()) * 1024
+		CLIENT.maxBatchEvents = int(self.ownerComp.par[self.SYNC_MAX_EVENTS_PAR].eval())
+		self.scheduler.budgetMs = float(self.ownerComp.par[self.REFRESH_BUDGET_PAR].eval())
+		# Writes are only combined while frame callbacks fire, since the flush runs at frame end.
+		# Anything still buffered when this is turned off is applied by the next flush
+		PAR_WRITES.enabled = bool(self.ownerComp.par[self.COMBINE_WRITES_PAR].eval()) and CLIENT.frameDriven
+		CLIENT.commandBudgetMs = float(self.ownerComp.par[self.COMMAND_BUDGET_PAR].eval())
+		CLIENT.commandQueue.maxDepth = int(self.ownerComp.par[self.COMMAND_QUEUE_MAX_PAR].eval())
+		CLIENT.commandQueue.overflow = self.ownerComp.par[self.COMMAND_OVERFLOW_PAR].eval()
+		CLIENT.inbound.enabled = bool(self.ownerComp.par[self.THREADED_DECODE_PAR].eval())
+		CLIENT.outbound.enabled = bool(self.ownerComp.par[self.THREADED_ENCODE_PAR].eval())
+		PHASE_TIMER.enabled = bool(self.ownerComp.par[self.PHASE_TIMING_PAR].eval())
+		CLIENT.latency.enabled = bool(self.ownerComp.par[self.LATENCY_TRACING_PAR].eval())
+		CLIENT.latency.echo = bool(self.ownerComp.par[self.ECHO_LATENCY_PAR].eval())
 
 	def updateStatsPage(
 		self,
@@ -152,6 +482,28 @@ class RshipExt:
 		remoteTargets: int | None = None,
 		remoteActions: int | None = None,
 		remoteEmitters: int | None = None,
+		schemaCacheHits: int | None = None,
+		schemaCacheMisses: int | None = None,
+		pulsesSent: int | None = None,
+		pulsesSuppressed: int | None = None,
+		oversizedEvents: int | None = None,
+		collapsedWrites: int | None = None,
+		commandQueueDepth: int | None = None,
+		commandWaitMs: float | None = None,
+		commandMaxWaitMs: float | None = None,
+		commandsCollapsed: int | None = None,
+		commandsDropped: int | None = None,
+		outboundBacklog: int | None = None,
+		outboundBacklogEvents: int | None = None,
+		activeQueries: int | None = None,
+		pendingReports: int | None = None,
+		registeredActions: int | None = None,
+		registeredHandlers: int | None = None,
+		emitterKeys: int | None = None,
+		trackedStatuses: int | None = None,
+		sweptEntries: int | None = None,
+		syncState: str | None = None,
+		syncProgress: float | None = None,
 	):
 		if localTargets is not None:
 			self.ownerComp.par[self.LOCAL_TARGETS_PAR] = int(localTargets)
@@ -168,6 +520,50 @@ class RshipExt:
 		if remoteEmitters is not None:
 			self.remoteStats['emitters'] = int(remoteEmitters)
 			self.ownerComp.par[self.REMOTE_EMITTERS_PAR] = int(remoteEmitters)
+		if schemaCacheHits is not None:
+			self.ownerComp.par[self.SCHEMA_CACHE_HITS_PAR] = int(schemaCacheHits)
+		if schemaCacheMisses is not None:
+			self.ownerComp.par[self.SCHEMA_CACHE_MISSES_PAR] = int(schemaCacheMisses)
+		if pulsesSent is not None:
+			self.ownerComp.par[self.PULSES_SENT_PAR] = int(pulsesSent)
+		if pulsesSuppressed is not None:
+			self.ownerComp.par[self.PULSES_SUPPRESSED_PAR] = int(pulsesSuppressed)
+		if oversizedEvents is not None:
+			self.ownerComp.par[self.OVERSIZED_EVENTS_PAR] = int(oversizedEvents)
+		if collapsedWrites is not None:
+			self.ownerComp.par[self.COLLAPSED_WRITES_PAR] = int(collapsedWrites)
+		if commandQueueDepth is not None:
+			self.ownerComp.par[self.COMMAND_QUEUE_DEPTH_PAR] = int(commandQueueDepth)
+		if commandWaitMs is not None:
+			self.ownerComp.par[self.COMMAND_WAIT_PAR] = float(commandWaitMs)
+		if commandMaxWaitMs is not None:
+			self.ownerComp.par[self.COMMAND_MAX_WAIT_PAR] = float(commandMaxWaitMs)
+		if commandsCollapsed is not None:
+			self.ownerComp.par[self.COMMANDS_COLLAPSED_PAR] = int(commandsCollapsed)
+		if commandsDropped is not None:
+			self.ownerComp.par[self.COMMANDS_DROPPED_PAR] = int(commandsDropped)
+		if outboundBacklog is not None:
+			self.ownerComp.par[self.OUTBOUND_BACKLOG_PAR] = int(outboundBacklog)
+		if outboundBacklogEvents is not None:
+			self.ownerComp.par[self.OUTBOUND_BACKLOG_EVENTS_PAR] = int(outboundBacklogEvents)
+		if activeQueries is not None:
+			self.ownerComp.par[self.ACTIVE_QUERIES_PAR] = int(activeQueries)
+		if pendingReports is not None:
+			self.ownerComp.par[self.PENDING_REPORTS_PAR] = int(pendingReports)
+		if registeredActions is not None:
+			self.ownerComp.par[self.REGISTERED_ACTIONS_PAR] = int(registeredActions)
+		if registeredHandlers is not None:
+			self.ownerComp.par[self.REGISTERED_HANDLERS_PAR] = int(registeredHandlers)
+		if emitterKeys is not None:
+			self.ownerComp.par[self.EMITTER_KEYS_PAR] = int(emitterKeys)
+		if trackedStatuses is not None:
+			self.ownerComp.par[self.TRACKED_STATUSES_PAR] = int(trackedStatuses)
+		if sweptEntries is not None:
+			self.ownerComp.par[self.SWEPT_ENTRIES_PAR] = int(sweptEntries)
+		if syncState is not None:
+			self.ownerComp.par[self.SYNC_STATE_PAR] = syncState
+		if syncProgress is not None:
+			self.ownerComp.par[self.SYNC_PROGRESS_PAR] = float(syncProgress)
 
 	def _transitionState(self, newState: RshipState):
 		"""Transition to a new state with logging"""
@@ -213,13 +609,20 @@ class RshipExt:
 		op.RS_LOG.Debug(f"[RshipExt]: Instance created: {self.instance.id}")
 
 	def OnProjectPreSave(self):
+		# The rescan is timed as part of the refresh it leads into, which supersedes
+		# any refresh still running
+		PHASE_TIMER.begin()
+
 		# Always rescan and update local cache
 		self.cookTargetList()
 		self.updateExecInfo()
 		
-		# Only send to server if we're ready
+		# Only send to server if we're ready. Targets are built before returning,
+		# since building stores target ids and util pars that must be in the saved file
 		if self._ensureReady():
-			self.refreshProjectData()
+			self.refreshProjectData(buildNow=True)
+		else:
+			PHASE_TIMER.cancel()
 
 
 # region exec info 
@@ -343,46 +746,57 @@ class RshipExt:
 
 	def targetListUpdated(self, data: QueryResponse):
 		"""
-		Process query response for remote targets.
-		Only set offline targets that are in THIS response's upserts but not in our local cache.
+		Applies a remote Target query response to the mirror.
+		Targets that appear remotely but not in our local cache are set offline.
 		"""
-		op.RS_LOG.Info(f"[RshipExt]: >>> targetListUpdated - received {len(data.upserts)} upserts, {len(data.deletes)} deletes")
-		
-		# Update our tracking of all remote keys
-		remoteKeys = set([target.item['id'] for target in data.upserts])
-		
-		for key in remoteKeys:
-			self.remoteKeys.add(key)
-
-		for key in data.deletes:
-			self.remoteKeys.discard(key)
+		update = self._applyRemoteUpdate(self.remoteTargets, data)
+		if update is None:
+			return
 
-		# Only process the upserts in this specific response
-		# If a target is in this response but not in our local cache, set it offline
-		allLocalKeys = set(self.allTouchTargets.keys())
-		
 		offlineCount = 0
-		for target in data.upserts:
-			targetId = target.item['id']
-			if targetId not in allLocalKeys:
+		for targetId in update.upserted:
+			if targetId not in self.allTouchTargets:
 				# Only send offline status if it's different from what we last sent
-				if targetId not in self.sentTargetStatuses or self.sentTargetStatuses[targetId] != Status.Offline:
+				if self.sentTargetStatuses.get(targetId, None) != Status.Offline:
 					CLIENT.setTargetOffline(targetId, self.instance.id)
 					self.sentTargetStatuses[targetId] = Status.Offline
 					offlineCount += 1
-		
-		op.RS_LOG.Info(f"[RshipExt]: <<< targetListUpdated - set {offlineCount} targets offline")
-		self.updateStatsPage(remoteTargets=len(remoteKeys))
+
+		if offlineCount > 0:
+			op.RS_LOG.Info(f"[RshipExt]: Set {offlineCount} remote targets offline")
+		self.updateStatsPage(remoteTargets=len(self.remoteTargets))
 
 	def actionListUpdated(self, data: QueryResponse):
-		self.updateStatsPage(remoteActions=len(data.upserts))
+		if self._applyRemoteUpdate(self.remoteActions, data) is not None:
+			self.updateStatsPage(remoteActions=len(self.remoteActions))
 
 	def emitterListUpdated(self, data: QueryResponse):
-		self.updateStatsPage(remoteEmitters=len(data.upserts))
+		if self._applyRemoteUpdate(self.remoteEmitters, data) is not None:
+			self.updateStatsPage(remoteEmitters=len(self.remoteEmitters))
+
+	def _applyRemoteUpdate(self, mirror: RemoteMirror, data: QueryResponse) -> MirrorUpdate | None:
+		"""
+		Returns the applied update, or None if the response was stale or a gap
+		was found. A gap re-issues the query, which rebuilds the mirror from a fresh
+		snapshot; if that is rate limited, retryRemoteQueries sends it from the tick.
+		"""
+		requeryPending = mirror.requeryPending
+		update = mirror.apply(data)
+		if update.gap:
+			if not requeryPending:
+				op.RS_LOG.Warning(f"[RshipExt]: Missed a remote {mirror.itemType} update (sequence {mirror.sequence} -> {data.sequence})")
+			self.retryRemoteQueries()
+			return None
+		if update.stale:
+			return None
+		op.RS_LOG.Debug(f"[RshipExt]: Remote {mirror.itemType}: {len(update.upserted)} upserted, {len(update.deleted)} deleted, {len(mirror)} total")
+		return update
 
 
 	def OnRshipConnect(self):
 		CLIENT.setSend(self.websocketOp.sendText)
+		CLIENT.setSendBinary(self.websocketOp.sendBinary)
+		CLIENT.resetProtocol()
 		self.wsConnected = True
 		self._transitionState(RshipState.CONNECTED)
 		
@@ -393,41 +807,58 @@ class RshipExt:
 			op.RS_LOG.Warning("[RshipExt]: Connected but not ready - waiting for machine ID")
 			return
 		
+		if self.ownerComp.par[self.BINARY_PROTOCOL_PAR].eval():
+			CLIENT.requestBinaryProtocol()
+
 		# Send our data first, then query to clean up any stale remote targets
 		self._transitionState(RshipState.SYNCING)
 		op.RS_LOG.Info("[RshipExt]: Sending project data...")
-		self.refreshProjectData(sendEmitterValues=True)
+		# Query after the sync completes to ensure our targets are registered before cleanup
+		self.refreshProjectData(sendEmitterValues=True, onComplete=self._queryRemoteState)
+		op.RS_LOG.Info("[RshipExt]: <<< OnRshipConnect END")
+
+	def _queryRemoteState(self):
+		if not self.wsConnected:
+			return
+
 		op.RS_LOG.Info("[RshipExt]: Sending query for remote targets...")
-		# Query after sending to ensure our targets are registered before cleanup
-		CLIENT.sendQuery(
-			GetTargetsByQuery({
-				"serviceId": self.makeServiceId(),
-			}),
-			"Target",
-			self.targetListUpdated
-		)
-		CLIENT.sendQuery(
-			GetActionsByQuery({
-				"serviceId": self.makeServiceId(),
-				"schema": None,
-			}),
-			"Action",
-			self.actionListUpdated
-		)
-		CLIENT.sendQuery(
-			GetEmittersByQuery({
-				"serviceId": self.makeServiceId(),
-				"schema": None,
-			}),
-			"Emitter",
-			self.emitterListUpdated
-		)
+		for itemType in ("Target", "Action", "Emitter"):
+			self._sendRemoteQuery(itemType)
 		self._transitionState(RshipState.CONNECTED)
-		op.RS_LOG.Info("[RshipExt]: <<< OnRshipConnect END")
+
+	def _sendRemoteQuery(self, itemType: str):
+		"""
+		(Re)issues the live query for one remote item type. Re-issuing replaces the
+		previous subscription, and the mirror resets on the new tx's first response.
+		"""
+		serviceId = self.makeServiceId()
+		if itemType == "Target":
+			query = GetTargetsByQuery({"serviceId": serviceId})
+			handler = self.targetListUpdated
+		elif itemType == "Action":
+			query = GetActionsByQuery({"serviceId": serviceId, "schema": None})
+			handler = self.actionListUpdated
+		else:
+			query = GetEmittersByQuery({"serviceId": serviceId, "schema": None})
+			handler = self.emitterListUpdated
+
+		CLIENT.sendQuery(query, itemType, handler, onError=self.remoteQueryFailed)
+
+	def retryRemoteQueries(self):
+		if not self.wsConnected:
+			return
+		for mirror in (self.remoteTargets, self.remoteActions, self.remoteEmitters):
+			if mirror.shouldRequery():
+				self._sendRemoteQuery(mirror.itemType)
+
+	def remoteQueryFailed(self, error: QueryError):
+		op.RS_LOG.Warning(f"[RshipExt]: Remote query {error.queryId} failed: {error.message}")
 
 
 	def OnRshipDisconnect(self):
 		self.wsConnected = False
+		CLIENT.resetProtocol()
+		self.cancelRefresh()
 		
 		# Transition back to appropriate state
 		if self._machineId:
@@ -435,7 +866,20 @@ class RshipExt:
 		else:
 			self._transitionState(RshipState.UNINITIALIZED)
 		
-		self.sentTargetStatuses.clear()
+		self.sync.reset()
+		self.rateLimiter.reset()
+		# Queued commands can no longer be answered
+		CLIENT.commandQueue.clear()
+		CLIENT.outbound.clear()
+		# The server forgets live queries with the socket
+		CLIENT.subscriptions.clear()
+		self.remoteTargets.reset()
+		self.remoteActions.reset()
+		self.remoteEmitters.reset()
+		CLIENT.pulseFilter.reset()
+		CLIENT.pendingPulses.clear()
+		# The next server may have a different clock; histograms are kept
+		CLIENT.latency.clock.reset()
 		self.updateStatsPage(remoteTargets=0, remoteActions=0, remoteEmitters=0)
 
 
@@ -453,57 +897,281 @@ class RshipExt:
 
 	def OnRshipReceiveText(self, text: str):
 		CLIENT.setSend(self.websocketOp.sendText)
+		# Earlier messages still decoding on the worker are dispatched first
+		CLIENT.pollInbound()
 		CLIENT.parseMessage(text)
 
+	def OnRshipReceiveBinary(self, contents: bytes):
+		CLIENT.setSend(self.websocketOp.sendText)
+		CLIENT.pollInbound()
+		CLIENT.parseBinaryMessage(contents)
+
 
 	def OnTickInterval(self):
 		self.updateExecInfo()
+		self.checkFrameHooks()
+		# Config par changes take effect within a tick rather than being polled every frame
+		self.applyConfigPars()
+		CLIENT.expireSubscriptions()
+		self.retryRemoteQueries()
+
+		self.updateStatsPage(
+			pulsesSent=CLIENT.pulseFilter.sent,
+			pulsesSuppressed=CLIENT.pulseFilter.suppressed,
+			oversizedEvents=CLIENT.oversizedEvents,
+			collapsedWrites=PAR_WRITES.collapsed,
+			commandQueueDepth=CLIENT.commandQueue.depth,
+			commandWaitMs=CLIENT.commandQueue.lastWaitMs,
+			commandMaxWaitMs=CLIENT.commandQueue.maxWaitMs,
+			commandsCollapsed=CLIENT.commandQueue.collapsed,
+			commandsDropped=CLIENT.commandQueue.dropped,
+			outboundBacklog=CLIENT.outbound.pending,
+			outboundBacklogEvents=CLIENT.outbound.pendingEvents,
+			activeQueries=CLIENT.subscriptions.count(QUERY),
+			pendingReports=CLIENT.subscriptions.count(REPORT),
+		)
+		self.publishTraffic()
+		self.publishLatency()
+
+	def checkFrameHooks(self):
+		"""
+		The scheduler, command queue and outbound pump are driven by the Frame
+		Start/End callbacks of the project_save_hooks Execute DAT. If those are
+		not firing, e.g. their toggles are off in the tox, deferred work runs
+		inline instead and each tick does what the frame callbacks would.
+		"""
+		if self._lastFrameHookAt is not None and time.perf_counter() - self._lastFrameHookAt <= self.FRAME_HOOK_TIMEOUT:
+			return
+
+		if CLIENT.frameDriven or not self._frameHooksWarned:
+			op.RS_LOG.Warning("[RshipExt]: Frame Start/End callbacks are not firing, running deferred work inline")
+			self._frameHooksWarned = True
+		CLIENT.frameDriven = False
+		CLIENT.drainCommands(budgetMs=float('inf'))
+		self.runFrameStart()
+		self.scheduler.flush()
+		self.runFrameEnd()
+
+	def OnFrameStart(self, frame: int):
+		self._lastFrameHookAt = time.perf_counter()
+		CLIENT.frameDriven = True
+		self.runFrameStart()
+
+	def runFrameStart(self):
+		# Commands run before the network cooks so their writes land this frame
+		CLIENT.setSend(self.websocketOp.sendText)
+		CLIENT.pollInbound()
+		CLIENT.drainCommands()
+		# Buffered writes from those commands are applied now rather than at frame end
+		PAR_WRITES.flush()
+		CLIENT.pumpOutbound()
+
+		self.scheduler.tick()
+
+		syncState, syncProgress = self.scheduler.describe()
+		if syncState != self._lastSyncDescription:
+			self._lastSyncDescription = syncState
+			self.updateStatsPage(syncState=syncState, syncProgress=syncProgress)
+
+	def OnFrameEnd(self, frame: int):
+		self.runFrameEnd()
+
+	def runFrameEnd(self):
+		CLIENT.setSend(self.websocketOp.sendText)
+		CLIENT.pollInbound()
+		PAR_WRITES.flush()
+
+		for _, changeKey in self.rateLimiter.due(time.perf_counter()):
+			self._sendEmitterValue(changeKey)
+		CLIENT.pulseFilter.endFrame()
+
+		CLIENT.flushPulses()
+		CLIENT.pumpOutbound()
+
+	def onDestroyTD(self):
+		# Called by TouchDesigner before the extension is reinitialized
+		CLIENT.inbound.stop()
+		CLIENT.outbound.stop()
 
 # endregion WebSocket Callbacks
 
 # region Project Management
 
-	def refreshProjectData(self, sendEmitterValues=False):
+	def refreshProjectData(self, sendEmitterValues=False, onComplete: Callable[[], None] | None = None, buildNow=False):
+		"""
+		Rebuilds targets and syncs them to the server across frames. With buildNow
+		the targets are built before returning and only the sync is deferred.
+		"""
 		op.RS_LOG.Info(f"[RshipExt]: >>> refreshProjectData (sendEmitterValues={sendEmitterValues})")
 		if not self._ensureReady():
 			op.RS_LOG.Warning("[RshipExt]: Not ready, skipping refresh")
 			return
 
-		self.buildTargets()
+		# OnProjectPreSave began this run before its rescan. Otherwise a new run
+		# starts here and drops what a superseded refresh had timed
+		if not buildNow:
+			PHASE_TIMER.begin()
+
+		# A restarted refresh still owes its callers whatever the unfinished one promised
+		if self.REFRESH_JOB not in self.scheduler.jobs:
+			self._refreshCallbacks = []
+			self._refreshSendEmitterValues = False
+		self._refreshSendEmitterValues = self._refreshSendEmitterValues or sendEmitterValues
+		if onComplete is not None:
+			self._refreshCallbacks.append(onComplete)
+
+		if buildNow:
+			# Supersedes the build of any refresh still running
+			self.scheduler.cancel(self.REFRESH_JOB)
+			self.buildTargets()
+
+		self.scheduler.submit(
+			self.REFRESH_JOB,
+			self._refreshSteps(self._refreshSendEmitterValues, buildTargets=not buildNow),
+			onComplete=self._onRefreshComplete,
+		)
+		# Without frame callbacks nothing would tick the job
+		if not CLIENT.frameDriven:
+			self.scheduler.flush()
+
+	def _refreshSteps(self, sendEmitterValues: bool, buildTargets: bool = True):
+		if buildTargets:
+			yield from self._buildTargetsSteps()
 
 		if self.wsConnected:
-			self.sendProjectData(sendEmitterValues=sendEmitterValues)
+			yield from self._sendProjectDataSteps(sendEmitterValues=sendEmitterValues)
 		else:
 			op.RS_LOG.Warning("[RshipExt]: Not connected to Rship Server, Attempting to reconnect")
 			self.ownerComp.par.Reconnect.pulse()
-		
+
+	def _onRefreshComplete(self):
+		callbacks = self._refreshCallbacks
+		self._refreshCallbacks = []
+		self._refreshSendEmitterValues = False
 		op.RS_LOG.Info("[RshipExt]: <<< refreshProjectData complete")
+		self.publishPhaseTimings(PHASE_TIMER.endRun())
+		for callback in callbacks:
+			callback()
+
+	def publishPhaseTimings(self, run: Dict[str, float] | None):
+		"""
+		Shows a finished refresh's phase times on the stats page and appends
+		them to the phase_timings DAT, one row per refresh.
+		"""
+		if run is None:
+			return
+
+		for phase in PHASES:
+			last, mean, p95 = PHASE_TIMER.stats(phase)
+			self.ownerComp.par[self.phaseParName(phase, '')] = last
+			self.ownerComp.par[self.phaseParName(phase, 'mean')] = mean
+			self.ownerComp.par[self.phaseParName(phase, 'p95')] = p95
+
+		table = self.ownerComp.op(self.PHASE_TIMINGS_DAT)
+		if table is None:
+			table = self.ownerComp.create(tableDAT, self.PHASE_TIMINGS_DAT)
+		if table.numRows == 0:
+			table.appendRow(['run', *PHASES])
+		table.appendRow([PHASE_TIMER.runs, *[f'{run.get(phase, 0.0):.3f}' for phase in PHASES]])
+		while table.numRows > PHASE_TIMER.history + 1:
+			table.deleteRow(1)
+
+	def publishTraffic(self):
+		"""
+		Shows total traffic rates on the stats page and the per-kind breakdown
+		in the traffic DAT. Incoming commands are listed again by commandId.
+		"""
+		outMessages, outBytes, outLargest = CLIENT.outboundTraffic.rate()
+		inMessages, inBytes, inLargest = CLIENT.inboundTraffic.rate()
+		self.ownerComp.par[self.OUT_MESSAGES_RATE_PAR] = outMessages
+		self.ownerComp.par[self.OUT_BYTES_RATE_PAR] = outBytes
+		self.ownerComp.par[self.OUT_LARGEST_PAR] = outLargest
+		self.ownerComp.par[self.IN_MESSAGES_RATE_PAR] = inMessages
+		self.ownerComp.par[self.IN_BYTES_RATE_PAR] = inBytes
+		self.ownerComp.par[self.IN_LARGEST_PAR] = inLargest
+
+		table = self.ownerComp.op(self.TRAFFIC_DAT)
+		if table is None:
+			table = self.ownerComp.create(tableDAT, self.TRAFFIC_DAT)
+		table.clear()
+		table.appendRow(['direction', 'kind', 'messages_per_sec', 'bytes_per_sec', 'largest'])
+		for direction, meters in (('out', CLIENT.outboundTraffic), ('in', CLIENT.inboundTraffic), ('command', CLIENT.commandTraffic)):
+			for kind, messages, bytesPerSec, largest in meters.rates():
+				table.appendRow([direction, kind, f'{messages:.2f}', f'{bytesPerSec:.0f}', largest])
+
+	def publishLatency(self):
+		"""
+		Shows overall action latency percentiles on the stats page and the per
+		action type breakdown in the action_latency DAT.
+		"""
+		latency = CLIENT.latency
+		count, p50, p95, p99 = latency.summary('total')
+		self.ownerComp.par[self.ACTIONS_TRACED_PAR] = count
+		self.ownerComp.par[self.LATENCY_P50_PAR] = p50
+		self.ownerComp.par[self.LATENCY_P95_PAR] = p95
+		self.ownerComp.par[self.LATENCY_P99_PAR] = p99
+		self.ownerComp.par[self.TRANSIT_P95_PAR] = latency.summary('transit')[2]
+		self.ownerComp.par[self.QUEUE_P95_PAR] = latency.summary('queue')[2]
+		self.ownerComp.par[self.HANDLER_P95_PAR] = latency.summary('handler')[2]
+		offset = latency.clock.estimate
+		self.ownerComp.par[self.CLOCK_OFFSET_PAR] = 0.0 if offset is None else offset * 1000.0
+
+		table = self.ownerComp.op(self.ACTION_LATENCY_DAT)
+		if table is None:
+			table = self.ownerComp.create(tableDAT, self.ACTION_LATENCY_DAT)
+		table.clear()
+		table.appendRow(['action_type', 'stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+		for actionType, stage, stageCount, mean, stageP50, stageP95, stageP99 in latency.rows():
+			table.appendRow([actionType, stage, stageCount, *[f'{ms:.3f}' for ms in (mean, stageP50, stageP95, stageP99)]])
+
+	def cancelRefresh(self):
+		self.scheduler.cancel(self.REFRESH_JOB)
+		PHASE_TIMER.cancel()
+		self._refreshCallbacks = []
+		self._refreshSendEmitterValues = False
 
 
 	def cookTargetList(self):
 		# op.RS_LOG.Info("[RshipExt]: Finding OpTargets...")
-		self.findTargetsOp.cook(force=True)
+		with PHASE_TIMER.span('cook'):
+			self.findTargetsOp.cook(force=True)
 		
 
 	def buildTargets(self):
+		runSteps(self._buildTargetsSteps())
+
+	def _buildTargetsSteps(self):
 
 		# op.RS_LOG.Info("[RshipExt]: Building targets...")
 
-		ops = [op(self.targetsOp[i, 0].val) for i in range(0, self.targetsOp.numRows)]
+		paths = [self.targetsOp[i, 0].val for i in range(0, self.targetsOp.numRows)]
 
-		# op.RS_LOG.Info("[RshipExt]: Found", len(ops), "ops")
+		# op.RS_LOG.Info("[RshipExt]: Found", len(paths), "ops")
 
 		foundOps: Dict[str, OPTarget] = {}
+		# OPTargets are reused while their OP's structure is unchanged
+		previousOps: Dict[str, OPTarget] = {opTarget.path: opTarget for opTarget in self.opTargets.values()}
+		rebuilt = 0
+
+		for index, path in enumerate(paths):
+			# The OP may have been deleted since the list was cooked a few frames ago
+			o = op(path)
+			if o is not None:
+				with PHASE_TIMER.span('targets'):
+					opTarget = previousOps.get(path, None)
+					if opTarget is None or not opTarget.isCurrent(structuralFingerprint(o), self.instance):
+						opTarget = OPTarget(o, self.instance)
+						rebuilt += 1
 
-		for o in ops:
-			opTarget = OPTarget(o, self.instance)
+				if opTarget.id in foundOps:
+					op.RS_LOG.Warning(f"[RshipExt]: Target with ID {opTarget.id} already exists")
+					opTarget.regenerateId()
 
-			if opTarget.id in foundOps:
-				op.RS_LOG.Warning(f"[RshipExt]: Target with ID {opTarget.id} already exists")
-				opTarget.regenerateId()
+				foundOps[opTarget.id] = opTarget
 
-			foundOps[opTarget.id] = opTarget
+			yield ('build targets', index + 1, len(paths))
 
+		op.RS_LOG.Debug(f"[RshipExt]: Rebuilt {rebuilt} of {len(foundOps)} op targets")
 		self.opTargets = foundOps
 
 		self.streamSourcesOp.clear()
@@ -511,92 +1179,158 @@ class RshipExt:
 			if opTarget.getStreamInfo() is not None and opTarget.streamSource is not None:
 				self.streamSourcesOp.appendRow([opTarget.getStreamInfo().id, opTarget.streamSource])
 
-		allTouchTargets = [child for target in self.opTargets.values() for child in target.collectChildren()]
+		with PHASE_TIMER.span('children'):
+			allTouchTargets = [child for target in self.opTargets.values() for child in target.collectItems().touchTargets]
 
-		# Track previously known targets
-		previousTargets = set(self.allTouchTargets.keys())
-		
+		# Targets removed locally are set offline by the sync diff in sendProjectData
 		self.allTouchTargets = {target.id: target for target in allTouchTargets}
-		
-		# Find targets that were removed locally
-		currentTargets = set(self.allTouchTargets.keys())
-		removedTargets = previousTargets - currentTargets
-		
-		# Mark removed targets as offline if we're connected
-		if self.wsConnected and self.instance:
-			for targetId in removedTargets:
-				op.RS_LOG.Debug(f"[RshipExt]: Target {targetId} removed locally, setting offline")
-				if targetId not in self.sentTargetStatuses or self.sentTargetStatuses[targetId] != Status.Offline:
-					CLIENT.setTargetOffline(targetId, self.instance.id)
-					self.sentTargetStatuses[targetId] = Status.Offline
 
 
 # endregion Project Management
 
 # region ws senders
 
+	def sweepTargetStatuses(self, localTargets: List[Target]):
+		"""
+		Forgets statuses for targets that are neither local nor on the server.
+		Offline statuses for targets the server still has are kept so they are
+		not sent again. Needs a live remote target mirror to tell the two apart.
+		"""
+		if self.remoteTargets.tx is None:
+			return
+		localIds = {target.id for target in localTargets}
+		stale = [
+			targetId for targetId in self.sentTargetStatuses.keys()
+			if targetId not in localIds and targetId not in self.remoteTargets
+		]
+		for targetId in stale:
+			del self.sentTargetStatuses[targetId]
+		self.sweptEntries += len(stale)
+
+	def updateRegistryStats(self):
+		self.updateStatsPage(
+			registeredActions=len(CLIENT.actions),
+			registeredHandlers=len(CLIENT.handlers),
+			emitterKeys=len(self.emitterIndex),
+			trackedStatuses=len(self.sentTargetStatuses),
+			sweptEntries=self.sweptEntries,
+		)
+
 	def sendProjectData(self, sendEmitterValues = False):
+		runSteps(self._sendProjectDataSteps(sendEmitterValues=sendEmitterValues))
+
+	def _sendProjectDataSteps(self, sendEmitterValues = False):
 		if self.instance is None:
 			op.RS_LOG.Error("[RshipExt]: Instance is not set, cannot send project data")
 			return
 
 		CLIENT.setSend(self.websocketOp.sendText)
-		events = [CLIENT.buildSetEvent(self.instance)]
+		items = [self.instance]
 
 		for opTarget in self.opTargets.values():
 			streamInfo = opTarget.getStreamInfo()
 			if streamInfo is not None:
-				events.append(CLIENT.buildSetEvent(streamInfo))
-
-		allTouchTargets = [child for target in self.opTargets.values() for child in target.collectChildren()]
-
-		allTargets = [target.getTarget() for target in allTouchTargets]
-		allActions = [action for target in allTouchTargets for action in target.getActions()]
-		allEmitters = [emitter for target in allTouchTargets for emitter in target.getEmitters()]
-
+				items.append(streamInfo)
+
+		allTouchTargets = []
+		allTargets = []
+		allActions = []
+		allEmitters = []
+		emitterRateSources: Dict[str, Callable[[], float | None]] = {}
+
+		opTargets = list(self.opTargets.values())
+		for index, opTarget in enumerate(opTargets):
+			with PHASE_TIMER.span('children'):
+				opItems = opTarget.collectItems()
+			allTouchTargets.extend(opItems.touchTargets)
+			allTargets.extend(opItems.targets)
+			allActions.extend(opItems.actions)
+			for emitter in opItems.emitters:
+				allEmitters.append(emitter)
+				emitterRateSources[emitter.id] = opTarget.getEmitterMaxRate
+			yield ('collect items', index + 1, len(opTargets))
+
+		# Registries are swapped in one step so pulses and actions never see a half-built index
 		self.allTouchTargets = {target.id: target for target in allTouchTargets}
-		self.emitterIndex.clear()
-		self.emitterHandlers.clear()
 
-		op.RS_LOG.Info(f"[RshipExt]: Sending {len(allTargets)} targets, {len(allActions)} actions, {len(allEmitters)} emitters")
 		self.updateStatsPage(
 			localTargets=len(allTargets),
 			localActions=len(allActions),
 			localEmitters=len(allEmitters),
+			schemaCacheHits=SCHEMA_CACHE.hits,
+			schemaCacheMisses=SCHEMA_CACHE.misses,
 		)
-		
-		statusesToSend = 0
-		for target in allTargets:
-			events.append(CLIENT.buildSetEvent(target))
-			
-			# Only send status if it's changed or never been sent
-			if target.id not in self.sentTargetStatuses or self.sentTargetStatuses[target.id] != Status.Online:
-				events.append(CLIENT.buildTargetStatusEvent(target.id, self.instance.id, Status.Online))
-				self.sentTargetStatuses[target.id] = Status.Online
-				statusesToSend += 1
-		
-		op.RS_LOG.Info(f"[RshipExt]: Sent {statusesToSend} target status updates (Online)")
-		
+
+		# Handlers and change keys stay on the items; they are excluded from the wire by WIRE_EXCLUDE.
+		# Anything the previous build registered but this one did not is swept right away
+		CLIENT.beginBuild()
 		for action in allActions:
 			CLIENT.saveHandler(action.id, action.handler)
-			
-			del action.handler  # Remove handler from action to avoid circular references
 			CLIENT.actions[action.id] = action
-			events.append(CLIENT.buildSetEvent(action))
+		self.sweptEntries += CLIENT.sweepRegistries()
 
+		emitterIndex: Dict[str, Emitter] = {}
+		emitterHandlers: Dict[str, Callable] = {}
 		for emitter in allEmitters:
-			changeKeys = getattr(emitter, 'changeKeys', [emitter.changeKey])
+			changeKeys = emitter.changeKeys or [emitter.changeKey]
 			for changeKey in changeKeys:
-				self.emitterIndex[changeKey] = emitter
-				self.emitterHandlers[changeKey] = emitter.handler
-			
-			del emitter.handler  # Remove handler from emitter to avoid circular references
-			del emitter.changeKey
-			if hasattr(emitter, 'changeKeys'):
-				del emitter.changeKeys
-			events.append(CLIENT.buildSetEvent(emitter))
+				emitterIndex[changeKey] = emitter
+				emitterHandlers[changeKey] = emitter.handler
+
+			shape = getattr(emitter.handler, '__self__', None)
+			CLIENT.pulseFilter.setMomentary(emitter.id, getattr(shape, 'isMomentary', False))
+
+		# Rebuilt from scratch each build, so the swap itself is the sweep
+		self.sweptEntries += sum(1 for key in self.emitterIndex.keys() if key not in emitterIndex)
+		self.sweptEntries += sum(1 for key in self.emitterHandlers.keys() if key not in emitterHandlers)
+		self.emitterIndex = emitterIndex
+		self.emitterHandlers = emitterHandlers
+
+		self.rateLimiter.clearRates()
+		for emitterId, source in emitterRateSources.items():
+			self.rateLimiter.setRateSource(emitterId, source)
+
+		items.extend(allTargets)
+		items.extend(allActions)
+		items.extend(allEmitters)
+
+		diff = self.sync.begin()
+		for start in range(0, len(items), self.SYNC_STEP_SIZE):
+			with PHASE_TIMER.span('diff'):
+				for item in items[start:start + self.SYNC_STEP_SIZE]:
+					self.sync.stage(diff, item)
+			yield ('diff items', min(start + self.SYNC_STEP_SIZE, len(items)), len(items))
+		with PHASE_TIMER.span('diff'):
+			self.sync.finish(diff, {target.id: Status.Online for target in allTargets})
+
+		# Targets that disappeared locally are kept on the server as offline, everything else is deleted
+		removedItems = []
+		for itemType, itemId in diff.removed:
+			if itemType == 'Target':
+				if self.sentTargetStatuses.get(itemId, None) != Status.Offline:
+					diff.statuses[itemId] = Status.Offline
+			else:
+				removedItems.append((itemType, itemId))
+
+		# Items are ordered Instance, Streams, Targets, Actions, Emitters, so chunks arrive
+		# with parents first; statuses and deletes follow
+		events = []
+		for start in range(0, len(diff.changed), self.SYNC_STEP_SIZE):
+			with PHASE_TIMER.span('events'), ENVELOPE.batch():
+				events.extend(CLIENT.buildSetEvent(item) for item in diff.changed[start:start + self.SYNC_STEP_SIZE])
+			yield ('build events', len(events), len(diff.changed))
+
+		with PHASE_TIMER.span('events'), ENVELOPE.batch():
+			events.extend(CLIENT.buildTargetStatusEvent(targetId, self.instance.id, status) for targetId, status in diff.statuses.items())
+			events.extend(CLIENT.buildDelEvent(itemType, itemId) for itemType, itemId in removedItems)
 
-		CLIENT.sendEventBatch(events)
+		op.RS_LOG.Info(f"[RshipExt]: Syncing {len(items)} items: {len(diff.changed)} changed, {len(removedItems)} removed, {len(diff.statuses)} status updates")
+
+		sent = yield from CLIENT.sendEventBatchSteps(events, timed=True)
+		if sent:
+			self.sync.commit(diff)
+			self.sweepTargetStatuses(allTargets)
+		self.updateRegistryStats()
 
 		if not sendEmitterValues:
 			return
@@ -605,18 +1339,30 @@ class RshipExt:
 			emitter = self.emitterIndex.get(key, None)
 			if (emitter is not None) and (handler is not None):
 				data = handler()
-				CLIENT.pulseEmitter(emitter.id, data)
+				CLIENT.pulseEmitter(emitter.id, data, force=True)
 
 
 	def PulseEmitter(self, opPath: str, parName: str):
-		CLIENT.setSend(self.websocketOp.sendText)
 		changeKey = makeEmitterChangeKey(opPath, parName)
 
 		emitter = self.emitterIndex.get(changeKey, None)
 		if emitter is None:
 			op.RS_LOG.Debug(f"[RshipExt]: No emitter found for change key {changeKey}")
 			return
-		
+
+		# Too soon for this emitter: keep the latest change and flush it in OnFrameEnd
+		if not self.rateLimiter.offer(emitter.id, time.perf_counter(), changeKey):
+			return
+
+		self._sendEmitterValue(changeKey)
+
+	def _sendEmitterValue(self, changeKey: str):
+		CLIENT.setSend(self.websocketOp.sendText)
+
+		emitter = self.emitterIndex.get(changeKey, None)
+		if emitter is None:
+			return
+
 		handler = self.emitterHandlers.get(changeKey, None)
 
 		if handler is None:
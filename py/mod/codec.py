@@ -0,0 +1,131 @@
+import json
+from typing import List
+
+
+class JsonCodec:
+	"""
+	Wire codec backed by the stdlib json module. Always available.
+	"""
+
+	name = 'json'
+	binary = False
+	decodeErrors = (json.JSONDecodeError,)
+
+	def encode(self, payload: any) -> str:
+		return json.dumps(payload, separators=(',', ':'))
+
+	def decode(self, message: str | bytes) -> any:
+		return json.loads(message)
+
+	def sizeOf(self, encoded: str) -> int:
+		return len(encoded) if encoded.isascii() else len(encoded.encode('utf-8'))
+
+	def wrap(self, event: str, encodedData: str) -> str:
+		"""
+		Builds {"event": event, "data": ...} around data that is already encoded.
+		"""
+		return '{"event":"' + event + '","data":' + encodedData + '}'
+
+	def wrapList(self, event: str, encodedItems: List[str]) -> str:
+		return '{"event":"' + event + '","data":[' + ','.join(encodedItems) + ']}'
+
+
+class OrjsonCodec(JsonCodec):
+	name = 'orjson'
+
+	def __init__(self):
+		import orjson
+
+		self.orjson = orjson
+		self.options = orjson.OPT_NON_STR_KEYS
+		self.decodeErrors = (orjson.JSONDecodeError,)
+
+	def encode(self, payload: any) -> str:
+		return self.orjson.dumps(payload, option=self.options).decode('utf-8')
+
+	def decode(self, message: str | bytes) -> any:
+		return self.orjson.loads(message)
+
+
+class UjsonCodec(JsonCodec):
+	name = 'ujson'
+
+	def __init__(self):
+		import ujson
+
+		self.ujson = ujson
+		self.decodeErrors = (ValueError,)
+
+	def encode(self, payload: any) -> str:
+		return self.ujson.dumps(payload, ensure_ascii=False)
+
+	def decode(self, message: str | bytes) -> any:
+		return self.ujson.loads(message)
+
+
+# Fastest first, stdlib last
+CODEC_PREFERENCE: List[type] = [OrjsonCodec, UjsonCodec, JsonCodec]
+
+
+def availableCodecs() -> List[JsonCodec]:
+	codecs = []
+	for codecClass in CODEC_PREFERENCE:
+		try:
+			codecs.append(codecClass())
+		except ImportError:
+			continue
+	return codecs
+
+
+def selectCodec(preferred: str | None = None) -> JsonCodec:
+	"""
+	Returns the preferred codec if it can be imported, otherwise the fastest available one.
+	"""
+	codecs = availableCodecs()
+	if preferred is not None:
+		for codec in codecs:
+			if codec.name == preferred:
+				return codec
+	return codecs[0]
+
+
+class MsgpackCodec:
+	"""
+	Binary MessagePack codec, used only after the server agrees to it at connect time.
+	"""
+
+	name = 'msgpack'
+	binary = True
+
+	def __init__(self):
+		import msgpack
+
+		self.msgpack = msgpack
+		self.decodeErrors = (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError)
+
+	def encode(self, payload: any) -> bytes:
+		return self.msgpack.packb(payload, use_bin_type=True)
+
+	def decode(self, message: bytes) -> any:
+		return self.msgpack.unpackb(message, raw=False)
+
+	def sizeOf(self, encoded: bytes) -> int:
+		return len(encoded)
+
+	def _envelopeHead(self, event: str) -> bytes:
+		# fixmap with two entries: event, then data
+		return b'\x82' + self.msgpack.packb('event') + self.msgpack.packb(event) + self.msgpack.packb('data')
+
+	def wrap(self, event: str, encodedData: bytes) -> bytes:
+		return self._envelopeHead(event) + encodedData
+
+	def wrapList(self, event: str, encodedItems: List[bytes]) -> bytes:
+		arrayHead = self.msgpack.Packer().pack_array_header(len(encodedItems))
+		return self._envelopeHead(event) + arrayHead + b''.join(encodedItems)
+
+
+def selectBinaryCodec() -> MsgpackCodec | None:
+	try:
+		return MsgpackCodec()
+	except ImportError:
+		return None
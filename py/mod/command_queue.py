@@ -0,0 +1,148 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple
+
+
+OVERFLOW_DROP_OLDEST = 'dropoldest'
+OVERFLOW_REJECT_NEWEST = 'rejectnewest'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_REJECT_NEWEST)
+
+# Txs of the earlier commands a merged command stands for, kept in its command dict
+MERGED_TXS = 'mergedTxs'
+
+
+def mergeQueuedCommands(older: dict, newer: dict) -> dict:
+	"""
+	Merges two queued target action commands. The action data dicts are merged
+	shallowly with the newer keys winning; the rest comes from the newer command.
+	"""
+	olderCommand = older.get('command', {})
+	newerCommand = newer.get('command', {})
+	merged = dict(newerCommand)
+	merged['data'] = {**olderCommand.get('data', {}), **newerCommand.get('data', {})}
+	merged[MERGED_TXS] = [*commandTxs(olderCommand), *newerCommand.get(MERGED_TXS, ())]
+	return {**newer, 'command': merged}
+
+
+def commandTxs(command: dict) -> List[str]:
+	"""
+	Returns the tx of a command followed by the txs merged into it.
+	"""
+	return [command.get('tx', ''), *command.get(MERGED_TXS, ())]
+
+
+class QueuedCommand:
+	__slots__ = ('key', 'data', 'enqueuedAt', 'receivedAt')
+
+	def __init__(self, key: Hashable, data: dict, enqueuedAt: float, receivedAt: float | None = None):
+		self.key = key
+		self.data = data
+		self.enqueuedAt = enqueuedAt
+		# Wall clock receive time of data, for latency tracing
+		self.receivedAt = receivedAt
+
+
+class CommandQueue:
+	"""
+	Bounded FIFO of inbound commands, drained once per frame under a time budget.
+
+	Commands with a collapse key (an action id and target id) are merged into
+	the queued command with that key, which then runs once and answers for
+	all of them. When the queue is full the overflow policy either drops the
+	oldest command or rejects the new one. Dropped and rejected commands are
+	returned to the caller so every tx still gets an answer.
+	"""
+
+	def __init__(self, maxDepth: int = 1000, overflow: str = OVERFLOW_DROP_OLDEST):
+		self.maxDepth = maxDepth
+		self.overflow = overflow
+		self.entries: OrderedDict[Hashable, QueuedCommand] = OrderedDict()
+		self._sequence = 0
+		self.collapsed = 0
+		self.dropped = 0
+		self.lastWaitMs = 0.0
+		self.maxWaitMs = 0.0
+
+	@property
+	def depth(self) -> int:
+		return len(self.entries)
+
+	def push(
+		self,
+		data: dict,
+		key: Hashable | None = None,
+		now: float | None = None,
+		receivedAt: float | None = None,
+		merge: Callable[[dict, dict], dict] | None = None,
+	) -> List[Tuple[QueuedCommand, str]]:
+		"""
+		Queues a command, merging it with merge(queued, new) into a queued
+		command with the same key. Without merge, keyed commands queue
+		separately. Returns (command, 'overflow') pairs for commands that will
+		not run.
+		"""
+		now = time.perf_counter() if now is None else now
+		existing = self.entries.get(key, None) if key is not None else None
+		if existing is not None and merge is not None:
+			# Keep the original position and wait time so a stream of updates cannot starve
+			self.collapsed += 1
+			existing.data = merge(existing.data, data)
+			existing.receivedAt = receivedAt
+			return []
+
+		if key is None or existing is not None:
+			self._sequence += 1
+			key = ('seq', self._sequence)
+
+		skipped = []
+		if self.maxDepth > 0 and len(self.entries) >= self.maxDepth:
+			self.dropped += 1
+			if self.overflow == OVERFLOW_REJECT_NEWEST:
+				return [(QueuedCommand(key, data, now, receivedAt), 'overflow')]
+			_, oldest = self.entries.popitem(last=False)
+			skipped.append((oldest, 'overflow'))
+
+		self.entries[key] = QueuedCommand(key, data, now, receivedAt)
+		return skipped
+
+	def drain(
+		self,
+		run: Callable[[dict, float | None], None],
+		budgetMs: float,
+		now: float | None = None,
+		onError: Callable[[QueuedCommand, Exception], None] | None = None,
+	) -> int:
+		"""
+		Runs queued commands in order until the budget is spent, passing each
+		command's data and receive time. At least one command runs per call so
+		a slow handler cannot stall the queue. A command that raises is handed
+		to onError and the drain carries on. Returns the number of commands run.
+		"""
+		if len(self.entries) == 0:
+			return 0
+
+		start = time.perf_counter() if now is None else now
+		deadline = start + budgetMs / 1000.0
+		ran = 0
+		maxWait = 0.0
+		while len(self.entries) > 0:
+			if ran > 0 and time.perf_counter() >= deadline:
+				break
+			_, command = self.entries.popitem(last=False)
+			maxWait = max(maxWait, (time.perf_counter() - command.enqueuedAt) * 1000.0)
+			ran += 1
+			try:
+				run(command.data, command.receivedAt)
+			except Exception as e:
+				if onError is None:
+					raise
+				onError(command, e)
+
+		self.lastWaitMs = maxWait
+		self.maxWaitMs = max(self.maxWaitMs, maxWait)
+		return ran
+
+	def clear(self) -> List[QueuedCommand]:
+		commands = list(self.entries.values())
+		self.entries.clear()
+		return commands
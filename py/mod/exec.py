@@ -1,11 +1,12 @@
+import time
 from datetime import datetime, timezone
-import json
 from enum import Enum
-from typing import Callable, Dict, List, Self
+from typing import Callable, Dict, Hashable, List, Self, Tuple
 
 from myko import (
 	CommandError,
 	CommandResponse,
+	ENVELOPE,
 	MCommand,
 	MEvent,
 	MEventType,
@@ -21,13 +22,25 @@ from myko import (
 	ReportResponse,
 	WSCommand,
 	WSEvent,
-	WSEventBatch,
 	WSQuery,
 	WSReport,
 )
+from codec import selectBinaryCodec, selectCodec
+from command_queue import CommandQueue, QueuedCommand, commandTxs, mergeQueuedCommands
+from inbound import InboundDecoder, decodeEnvelope
+from latency import LatencyTracer
+from outbound import OutboundSerializer, OversizedNote, encodeEventMessages, eventMessageKind
+from pulse import PulseDeduper
+from registry import GenerationRegistry
+from scheduler import runSteps
+from subscriptions import QUERY, REPORT, SubscriptionManager
+from timing import NO_SPAN, PHASE_TIMER
+from traffic import TrafficMeters, messageBytes
 
 
 class Target(MItem):
+	__slots__ = ('parentTargets', 'serviceId', 'category')
+
 	def __init__(
 		self,
 		id: str,
@@ -48,6 +61,8 @@ class Status(Enum):
 
 
 class TargetStatus(MItem):
+	__slots__ = ('targetId', 'status', 'instanceId')
+
 	def __init__(self, id: str, targetId: str, status: Enum, instanceId: str):
 		super().__init__(id, id)
 		self.targetId = targetId
@@ -56,6 +71,9 @@ class TargetStatus(MItem):
 
 
 class Action(MItem):
+	__slots__ = ('schema', 'schemaLayout', 'targetId', 'serviceId', 'handler', 'mergeable')
+	WIRE_EXCLUDE = ('handler', 'mergeable')
+
 	def __init__(
 		self,
 		id: str,
@@ -65,6 +83,7 @@ class Action(MItem):
 		schema: any,
 		handler: Callable[[Self, Dict[str, any]], None],
 		schemaLayout: any = None,
+		mergeable: bool = False,
 	):
 		super().__init__(id, name)
 		self.schema = schema
@@ -72,9 +91,15 @@ class Action(MItem):
 		self.targetId = targetId
 		self.serviceId = serviceId
 		self.handler = handler
+		# Set for actions that only write values, so queued commands for the same
+		# target can be merged key by key; triggers are never merged
+		self.mergeable = mergeable
 
 
 class Emitter(MItem):
+	__slots__ = ('targetId', 'serviceId', 'schema', 'changeKey', 'changeKeys', 'handler')
+	WIRE_EXCLUDE = ('changeKey', 'changeKeys', 'handler')
+
 	def __init__(
 		self,
 		id: str,
@@ -90,10 +115,13 @@ class Emitter(MItem):
 		self.serviceId = serviceId
 		self.schema = schema
 		self.changeKey = changeKey
+		self.changeKeys: List[str] | None = None
 		self.handler = handler
 
 
 class Pulse(MItem):
+	__slots__ = ('emitterId', 'data', 'clientId')
+
 	def __init__(self, id: str, emitterId: str, data: any):
 		super().__init__(id, id)
 		self.emitterId = emitterId
@@ -110,6 +138,19 @@ class InstanceStatus(Enum):
 
 
 class Instance(MItem):
+	__slots__ = (
+		'serviceId',
+		'serviceTypeCode',
+		'status',
+		'machineId',
+		'color',
+		'clientId',
+		'message',
+		'renderDomain',
+		'coordinateSpace',
+		'clusterId',
+	)
+
 	def __init__(
 		self,
 		id: str,
@@ -143,6 +184,8 @@ class Instance(MItem):
 
 
 class Machine(MItem):
+	__slots__ = ('dnsName', 'execName', 'addresses', 'fileDownloadInfo')
+
 	def __init__(
 		self,
 		id: str,
@@ -160,6 +203,8 @@ class Machine(MItem):
 
 
 class Service(MItem):
+	__slots__ = ('systemTypeCode',)
+
 	def __init__(self, id: str, name: str, systemTypeCode: str):
 		super().__init__(id, name)
 		self.systemTypeCode = systemTypeCode
@@ -207,6 +252,8 @@ class CompactBatchTargetActionGroup:
 
 
 class Stream(MItem):
+	__slots__ = ('clientId',)
+
 	def __init__(self, id: str, name: str):
 		super().__init__(id, name)
 		self.clientId = None
@@ -220,6 +267,8 @@ class IceCandidate:
 
 
 class WebRTCConnection(MItem):
+	__slots__ = ('offerCandidates', 'answerCandidates', 'sdpOffer', 'sdpAnswer', 'streamId')
+
 	offerCandidates: List[IceCandidate]
 	answerCandidates: List[IceCandidate]
 	sdpOffer: str
@@ -228,6 +277,10 @@ class WebRTCConnection(MItem):
 
 	def __init__(self, id: str, streamId: str):
 		super().__init__(id, id)
+		self.offerCandidates = []
+		self.answerCandidates = []
+		self.sdpOffer = None
+		self.sdpAnswer = None
 		self.streamId = streamId
 
 
@@ -285,104 +338,335 @@ class SetAnswer(MCommand):
 
 class ExecClient:
 	_shared_send = None
+	# Events snapshotted between scheduler yields when encoding on the worker
+	SNAPSHOT_STEP_SIZE = 500
 
 	def __init__(self) -> None:
 		self.targetStatuses: Dict[str, TargetStatus] = {}
-		self.actions: Dict[str, Action] = {}
-		self.handlers: Dict[str, callable] = {}
+		# Tagged with the project build that registered them; see beginBuild and sweepRegistries
+		self.actions: GenerationRegistry = GenerationRegistry()
+		self.handlers: GenerationRegistry = GenerationRegistry()
 		self.clientId: str = None
 		self.webRtcConnections: Dict[str, str] = {}
-		self.queryHandlers: Dict[str, callable] = {}
-		self.reportHandlers: Dict[str, callable] = {}
+		# Query and report handlers by tx; re-issued queries replace their old subscription
+		self.subscriptions = SubscriptionManager()
+		# Fastest JSON implementation importable at startup, stdlib json otherwise
+		self.codec = selectCodec()
+		# Set by RshipExt while its Frame Start/End callbacks are firing. Work that
+		# waits for a frame callback is only deferred then; otherwise it runs inline
+		self.frameDriven = False
+		# MessagePack is only used once the server acks it in reply to requestBinaryProtocol
+		self.binaryCodec = selectBinaryCodec()
+		self.binaryProtocol = False
+		self.pulseFilter = PulseDeduper()
+		# Pulses are held until flushPulses at frame end; 0 sends each pulse immediately
+		self.pulseBatchSize: int = 0
+		self.pendingPulses: Dict[str, Pulse] = {}
+		# Event batches are split so no message exceeds these bounds; 0 means unbounded
+		self.maxBatchBytes: int = 512 * 1024
+		self.maxBatchEvents: int = 2000
+		self.oversizedEvents = 0
+		# Commands are queued and run by drainCommands at frame start; a budget of 0 runs them inline
+		self.commandQueue = CommandQueue()
+		self.commandBudgetMs: float = 0
+		# Large inbound messages are decoded on a worker thread and dispatched by pollInbound
+		self.inbound = InboundDecoder()
+		# When enabled, outbound messages are encoded on a worker and sent by pumpOutbound
+		self.outbound = OutboundSerializer()
+		# Messages and bytes per second by event name; incoming commands also by commandId
+		self.outboundTraffic = TrafficMeters()
+		self.inboundTraffic = TrafficMeters()
+		self.commandTraffic = TrafficMeters()
+		# Server-to-handler latency of target actions, per action type
+		self.latency = LatencyTracer()
 
 	def setSend(self, send):
 		self.send = send
 		ExecClient._shared_send = send
 
+	def setSendBinary(self, sendBinary):
+		self.sendBinary = sendBinary
+
 	def log(self, message):
 		op.RS_LOG.Info('RshipClient: ' + message)
 
-	def _sendPayload(self, payload: dict):
+	def _outgoingCodec(self):
+		if self.binaryProtocol and getattr(self, 'sendBinary', None) is not None:
+			return self.binaryCodec
+		return self.codec
+
+	def _sendPayload(self, payload: dict) -> bool:
+		if self.outbound.shouldQueue(self.frameDriven):
+			if not self._canSend():
+				return False
+			self.outbound.submitPayload(self._outgoingCodec(), payload)
+			return True
+		return self._sendEncoded(self._outgoingCodec().encode(payload), payload.get('event', None))
+
+	def _canSend(self) -> bool:
+		if getattr(self, 'send', None) is None and ExecClient._shared_send is None:
+			self.log('Cant send, no socket')
+			return False
+		return True
+
+	def _sendEncoded(self, message: str | bytes, kind: str | None = None) -> bool:
+		if isinstance(message, bytes):
+			self.sendBinary(message)
+			self.outboundTraffic.record(kind, len(message))
+			return True
+
 		send = getattr(self, 'send', None) or ExecClient._shared_send
 		if send is None:
 			self.log('Cant send, no socket')
-			return
-		send(json.dumps(payload))
+			return False
+		send(message)
+		self.outboundTraffic.record(kind, messageBytes(message))
+		return True
 
 	def buildSetEvent(self, item: MItem | dict, itemType: str | None = None) -> MEvent:
 		return MEvent(changeType=MEventType.SET, item=item, itemType=itemType)
 
-	def sendEvent(self, event: MEvent):
-		self._sendPayload(WSEvent(event).__dict__)
-
-	def sendEventBatch(self, events: List[MEvent]):
+	def buildDelEvent(self, itemType: str, itemId: str) -> MEvent:
+		return MEvent(changeType=MEventType.DEL, item={'id': itemId}, itemType=itemType)
+
+	def sendEvent(self, event: MEvent) -> bool:
+		return self._sendPayload(WSEvent(event).__dict__)
+
+	def sendEventBatch(self, events: List[MEvent]) -> bool:
+		"""
+		Sends events in order, split into messages bounded by maxBatchBytes and
+		maxBatchEvents. Each event is encoded once and the chunks are joined
+		without re-encoding.
+		"""
+		return runSteps(self.sendEventBatchSteps(events))
+
+	def sendEventBatchSteps(self, events: List[MEvent], timed: bool = False):
+		"""
+		Same as sendEventBatch, yielding ('send events', sent, total) as it goes.
+		Encoding and sending count towards the refresh phase timings if timed.
+		"""
 		if len(events) == 0:
-			return
-		if len(events) == 1:
-			self.sendEvent(events[0])
-			return
-		self._sendPayload(WSEventBatch(events).__dict__)
+			return True
+
+		encodeSpan = PHASE_TIMER.span('encode') if timed else NO_SPAN
+		sendSpan = PHASE_TIMER.span('send') if timed else NO_SPAN
+
+		codec = self._outgoingCodec()
+
+		if self.outbound.shouldQueue(self.frameDriven):
+			if not self._canSend():
+				return False
+			# Only the wire snapshot is taken here; encoding and chunking happen on the worker
+			wires = []
+			for start in range(0, len(events), self.SNAPSHOT_STEP_SIZE):
+				with encodeSpan:
+					wires.extend(event.to_wire() for event in events[start:start + self.SNAPSHOT_STEP_SIZE])
+				yield ('snapshot events', len(wires), len(events))
+			self.outbound.submitEvents(codec, wires, self.maxBatchBytes, self.maxBatchEvents)
+			return True
+
+		sent = True
+		sentEvents = 0
+		wires = (event.to_wire() for event in events)
+		messages = encodeEventMessages(codec, wires, self.maxBatchBytes, self.maxBatchEvents, self._noteOversized)
+		while True:
+			# Encoding is lazy, so each message is encoded when it is pulled here
+			with encodeSpan:
+				encoded = next(messages, None)
+			if encoded is None:
+				break
+			message, count = encoded
+			with sendSpan:
+				sent = self._sendEncoded(message, eventMessageKind(count)) and sent
+			sentEvents += count
+			yield ('send events', sentEvents, len(events))
+		return sent
+
+	def _noteOversized(self, note: OversizedNote):
+		itemType, itemId, size = note
+		self.oversizedEvents += 1
+		self.log(
+			f"{itemType} {itemId} is {size} bytes, "
+			f"over the {self.maxBatchBytes} byte batch limit; sending it on its own"
+		)
+
+	def pumpOutbound(self) -> int:
+		"""
+		Sends messages the outbound worker has finished, in submission order.
+		"""
+		sent = 0
+		for job in self.outbound.take():
+			if job.error is not None:
+				self.log('Error encoding outbound message: ' + job.error)
+			for note in job.oversized:
+				self._noteOversized(note)
+			for message, kind in zip(job.messages, job.kinds):
+				self._sendEncoded(message, kind)
+				sent += 1
+		return sent
 
 	def set(self, item: MItem, itemType: str | None = None):
 		self.sendEvent(self.buildSetEvent(item, itemType=itemType))
 
 	def parseMessage(self, message):
-		try:
-			d = json.loads(message)
-			event = d.get('event', None)
-			data = d.get('data', None)
-
-			if event == 'ws:m:command':
-				self.parseCommand(data)
-			elif event == 'ws:m:query-response':
-				self.parseQueryResponse(data)
-			elif event == 'ws:m:query-error':
-				self.parseQueryError(data)
-			elif event == 'ws:m:report-response':
-				self.parseReportResponse(data)
-			elif event == 'ws:m:report-error':
-				self.parseReportError(data)
-			elif event == 'ws:m:command-response':
-				self.log(f"Command acknowledged for tx={data.get('tx', 'unknown')}")
-			elif event == 'ws:m:command-error':
-				command_error = CommandError(
-					tx=data.get('tx', ''),
-					commandId=data.get('commandId', ''),
-					message=data.get('message', 'Unknown command error'),
-				)
-				self.log(
-					f"Command error [{command_error.commandId}] tx={command_error.tx}: {command_error.message}"
-				)
-		except json.JSONDecodeError as e:
-			self.log('Error parsing message: ' + str(e))
-			self.log('Message was: ' + message)
-
-	def sendQuery(self, query: MQuery, queryItemType: str, handler: Callable[[QueryResponse], None]):
+		receivedAt = time.time()
+		if self.inbound.shouldQueue(len(message), self.frameDriven):
+			self.inbound.submit(self.codec.decode, self.codec.decodeErrors, message, receivedAt)
+			return
+
+		d, error = decodeEnvelope(self.codec.decode, self.codec.decodeErrors, message)
+		self.dispatchDecoded(d, error, messageBytes(message), receivedAt)
+
+	def parseBinaryMessage(self, contents: bytes):
+		if self.binaryCodec is None:
+			self.log('Ignoring binary frame, msgpack is not installed')
+			return
+
+		receivedAt = time.time()
+		contents = bytes(contents)
+		if self.inbound.shouldQueue(len(contents), self.frameDriven):
+			self.inbound.submit(self.binaryCodec.decode, self.binaryCodec.decodeErrors, contents, receivedAt)
+			return
+
+		d, error = decodeEnvelope(self.binaryCodec.decode, self.binaryCodec.decodeErrors, contents)
+		self.dispatchDecoded(d, error, len(contents), receivedAt)
+
+	def pollInbound(self) -> int:
+		"""
+		Dispatches messages decoded off the main thread, in arrival order.
+		"""
+		results = self.inbound.poll()
+		for d, error, size, receivedAt in results:
+			self.dispatchDecoded(d, error, size, receivedAt)
+		return len(results)
+
+	def dispatchDecoded(self, d: dict | None, error: str | None, size: int, receivedAt: float | None):
+		"""
+		Dispatches a message checked by decodeEnvelope, or logs why it was dropped.
+		Messages decoded inline and on the worker both come through here.
+		"""
+		if error is not None:
+			self.log(error)
+			return
+		self.dispatchMessage(d, size, receivedAt)
+
+	def dispatchMessage(self, d: dict, size: int = 0, receivedAt: float | None = None):
+		event = d.get('event', None)
+		data = d.get('data', None)
+		self.inboundTraffic.record(event, size)
+
+		if event == 'ws:m:command':
+			if isinstance(data, dict):
+				self.commandTraffic.record(data.get('commandId', None), size)
+			self.parseCommand(data, receivedAt)
+		elif event == 'ws:m:query-response':
+			self.parseQueryResponse(data)
+		elif event == 'ws:m:query-error':
+			self.parseQueryError(data)
+		elif event == 'ws:m:report-response':
+			self.parseReportResponse(data)
+		elif event == 'ws:m:report-error':
+			self.parseReportError(data)
+		elif event == 'ws:m:command-response':
+			self.log(f"Command acknowledged for tx={data.get('tx', 'unknown')}")
+		elif event == 'ws:m:command-error':
+			command_error = CommandError(
+				tx=data.get('tx', ''),
+				commandId=data.get('commandId', ''),
+				message=data.get('message', 'Unknown command error'),
+			)
+			self.log(
+				f"Command error [{command_error.commandId}] tx={command_error.tx}: {command_error.message}"
+			)
+		elif event == 'ws:m:protocol-ack':
+			self.handleProtocolAck(data or {})
+
+	def requestBinaryProtocol(self) -> bool:
+		"""
+		Offers MessagePack to the server. Traffic stays JSON until a ws:m:protocol-ack
+		selects it, so servers that ignore the offer keep working unchanged.
+		"""
+		self.binaryProtocol = False
+		if self.binaryCodec is None:
+			self.log('Binary protocol requested but msgpack is not installed, staying on JSON')
+			return False
+		return self._sendPayload(
+			{
+				'event': 'ws:m:protocol',
+				'data': {'codecs': [self.binaryCodec.name, self.codec.name]},
+			}
+		)
+
+	def handleProtocolAck(self, data: dict):
+		codec = data.get('codec', None)
+		canSendBinary = getattr(self, 'sendBinary', None) is not None
+		self.binaryProtocol = self.binaryCodec is not None and codec == self.binaryCodec.name and canSendBinary
+		self.log(f"Wire protocol: {self.binaryCodec.name if self.binaryProtocol else 'json'}")
+
+	def resetProtocol(self):
+		self.binaryProtocol = False
+
+	def sendQuery(
+		self,
+		query: MQuery,
+		queryItemType: str,
+		handler: Callable[[QueryResponse], None],
+		key: Hashable | None = None,
+		onError: Callable[[QueryError], None] | None = None,
+	):
+		"""
+		Opens a live query. The key names the logical query and defaults to the
+		query class and item type, so re-issuing it replaces the old subscription.
+		"""
+		queryId = type(query).__name__
 		wrappedQuery = MWrappedQuery(
-			queryId=type(query).__name__,
+			queryId=queryId,
 			queryItemType=queryItemType,
 			query=query,
 		)
-		self.queryHandlers[query.tx] = handler
+		if key is None:
+			key = (queryId, queryItemType)
+		replaced = self.subscriptions.open(QUERY, query.tx, handler, key=key, onError=onError)
+		if replaced is not None:
+			self.cancelQuery(replaced.tx)
 		self._sendPayload(WSQuery(wrappedQuery).__dict__)
 
-	def sendReport(self, report: MReport, handler: Callable[[ReportResponse], None]):
+	def cancelQuery(self, tx: str):
+		"""
+		Stops handling a query and asks the server to stop pushing it.
+		"""
+		self.subscriptions.close(tx)
+		self._sendPayload({'event': 'ws:m:query-cancel', 'data': {'tx': tx}})
+
+	def sendReport(
+		self,
+		report: MReport,
+		handler: Callable[[ReportResponse], None],
+		onError: Callable[[ReportError], None] | None = None,
+	):
 		wrappedReport = MWrappedReport(
 			reportId=type(report).__name__,
 			report=report,
 		)
-		self.reportHandlers[report.tx] = handler
+		self.subscriptions.open(REPORT, report.tx, handler, onError=onError)
 		self._sendPayload(WSReport(wrappedReport).__dict__)
 
+	def expireSubscriptions(self):
+		for subscription in self.subscriptions.expire():
+			self.log(f'Report tx={subscription.tx} got no response, dropping its handler')
+
 	def sendCommand(self, command: MCommand):
 		wrappedCommand = MWrappedCommand(command)
 		self._sendPayload(WSCommand(wrappedCommand).__dict__)
 
-	def sendCommandResponse(self, tx: str, response: any = None):
+	def sendCommandResponse(self, tx: str, response: any = None, latency: Dict[str, float] | None = None):
+		data = CommandResponse(tx=tx, response=response).__dict__
+		if latency is not None:
+			data['latency'] = latency
 		self._sendPayload(
 			{
 				'event': 'ws:m:command-response',
-				'data': CommandResponse(tx=tx, response=response).__dict__,
+				'data': data,
 			}
 		)
 
@@ -394,11 +678,68 @@ class ExecClient:
 			}
 		)
 
-	def parseCommand(self, data):
+	def parseCommand(self, data, receivedAt: float | None = None):
+		# Queued commands are only drained from frame start, so without frame callbacks they run inline
+		if self.commandBudgetMs <= 0 or not self.frameDriven:
+			# Anything queued earlier still runs first
+			self.drainCommands(budgetMs=float('inf'))
+			self.executeCommand(data, receivedAt)
+			return
+
+		skipped = self.commandQueue.push(
+			data,
+			key=self._commandCollapseKey(data),
+			receivedAt=receivedAt,
+			merge=mergeQueuedCommands,
+		)
+		for command, reason in skipped:
+			self._answerSkippedCommand(command.data, reason)
+
+	def _commandCollapseKey(self, data: dict):
+		"""
+		Single target actions marked mergeable collapse per (action id, target id)
+		when their data is a dict. Other actions and batches never collapse.
+		"""
+		if data.get('commandId', None) != 'ExecTargetAction':
+			return None
+		command = data.get('command', {})
+		action = command.get('action', {})
+		actionId = action.get('id', None)
+		targetId = action.get('targetId', None)
+		if actionId is None or targetId is None or not isinstance(command.get('data', None), dict):
+			return None
+		registered = self.actions.get(actionId, None)
+		if registered is None or not registered.mergeable:
+			return None
+		return ('action', actionId, targetId)
+
+	def _answerSkippedCommand(self, data: dict, reason: str):
+		commandId = data.get('commandId', None)
+		command = data.get('command', {})
+		self.log(f'Command queue full, dropped {commandId} tx={command.get("tx", "")}')
+		for tx in commandTxs(command):
+			self.sendCommandError(tx, commandId, 'Command queue full')
+
+	def drainCommands(self, budgetMs: float | None = None) -> int:
+		return self.commandQueue.drain(
+			self.executeCommand,
+			self.commandBudgetMs if budgetMs is None else budgetMs,
+			onError=self._answerFailedCommand,
+		)
+
+	def _answerFailedCommand(self, command: QueuedCommand, error: Exception):
+		data = command.data if isinstance(command.data, dict) else {}
+		commandId = data.get('commandId', None)
+		wrapped = data.get('command', None) or {}
+		self.log(f'Command {commandId} tx={wrapped.get("tx", "")} failed: {error}')
+		for tx in commandTxs(wrapped):
+			self.sendCommandError(tx, commandId, str(error))
+
+	def executeCommand(self, data, receivedAt: float | None = None):
 		commandId = data.get('commandId', None)
 		command = data.get('command', {})
 		if commandId == 'ExecTargetAction':
-			self.handleIncomingExecTargetAction(commandId, command)
+			self.handleIncomingExecTargetAction(commandId, command, receivedAt=receivedAt)
 		elif commandId == 'BatchTargetAction':
 			for action_command in command.get('actions', []):
 				wrapped_action_command = dict(action_command)
@@ -408,17 +749,31 @@ class ExecClient:
 					wrapped_action_command['createdAt'] = command.get(
 						'createdAt', datetime.now(timezone.utc).isoformat()
 					)
-				self.handleIncomingExecTargetAction('ExecTargetAction', wrapped_action_command)
+				self.handleIncomingExecTargetAction('ExecTargetAction', wrapped_action_command, receivedAt=receivedAt)
 		elif commandId == 'CompactBatchTargetAction':
-			self.handleCompactBatchTargetAction(commandId, command)
+			self.handleCompactBatchTargetAction(commandId, command, receivedAt)
 		else:
 			self.log(f'Unhandled commandId: {commandId}')
 
-	def handleCompactBatchTargetAction(self, commandId: str, command: dict):
+	def handleCompactBatchTargetAction(self, commandId: str, command: dict, receivedAt: float | None = None):
+		"""
+		Applies a compact batch without expanding it into per-assignment commands.
+		Each group's action and handler are resolved once and its assignments are
+		grouped by target. For mergeable actions each target's payloads are merged
+		in assignment order and applied once, which leaves the same values as
+		applying them one by one. Other actions, e.g. pulses, run once per
+		assignment in order. Handler responses are gathered into the batch
+		response and failures are aggregated into a single command error.
+		"""
 		tx = command.get('tx', '')
-		created_at = command.get('createdAt', datetime.now(timezone.utc).isoformat())
 		groups = command.get('groups', [])
-		errors = []
+		errors: Dict[str, int] = {}
+		responses: List[dict] = []
+		trace = self.latency.begin(command.get('createdAt', None), receivedAt)
+		handled = 0
+
+		def addError(message: str):
+			errors[message] = errors.get(message, 0) + 1
 
 		for group in groups:
 			action_id = group.get('actionId', None)
@@ -426,55 +781,106 @@ class ExecClient:
 			assignments = group.get('assignments', [])
 
 			if action_id is None:
-				errors.append('Compact batch group missing actionId')
+				addError('Compact batch group missing actionId')
+				continue
+
+			action = self.actions.get(action_id, None)
+			handler = self.handlers.get(action_id, None)
+			if action is None or handler is None:
+				self.log('No action found for id: ' + action_id)
+				addError('No action found for id: ' + action_id)
 				continue
 
+			# Payload indexes per target, in assignment order; dict order keeps first-seen target order
+			payload_count = len(payloads)
+			indexes_by_target: Dict[str, List[int]] = {}
 			for assignment in assignments:
 				target_id = assignment.get('targetId', None)
-				instance_id = assignment.get('instanceId', None)
 				payload_index = assignment.get('payloadIndex', None)
 
 				if target_id is None or payload_index is None:
-					errors.append(f'Compact batch assignment missing targetId or payloadIndex for action {action_id}')
+					addError(f'Compact batch assignment missing targetId or payloadIndex for action {action_id}')
 					continue
 
-				if payload_index < 0 or payload_index >= len(payloads):
-					errors.append(
-						f'Compact batch payload missing for action {action_id} at index {payload_index}'
-					)
+				if payload_index < 0 or payload_index >= payload_count:
+					addError(f'Compact batch payload missing for action {action_id} at index {payload_index}')
 					continue
 
-				self.handleIncomingExecTargetAction(
-					'ExecTargetAction',
-					{
-						'tx': tx,
-						'createdAt': created_at,
-						'instanceId': instance_id,
-						'action': {
-							'id': action_id,
-							'targetId': target_id,
-						},
-						'data': payloads[payload_index],
-					},
-					respond=False,
-				)
+				indexes_by_target.setdefault(target_id, []).append(payload_index)
+
+			# Each payload is checked once, however many targets share it
+			mergeable = [action.mergeable and isinstance(payload, dict) for payload in payloads]
+			runs: List[Tuple[str, any]] = []
+			for target_id, indexes in indexes_by_target.items():
+				if not all(mergeable[index] for index in indexes):
+					runs.extend((target_id, payloads[index]) for index in indexes)
+				elif all(index == indexes[0] for index in indexes):
+					# A payload shared by many targets is passed on as-is
+					runs.append((target_id, payloads[indexes[0]]))
+				else:
+					merged = {}
+					for index in indexes:
+						merged.update(payloads[index])
+					runs.append((target_id, merged))
+
+			failed = 0
+			for target_id, payload in runs:
+				handlerStart = time.time() if trace is not None else 0.0
+				try:
+					response = handler(action, payload)
+				except Exception as e:
+					failed += 1
+					addError(f'ExecTargetAction failed for {action_id}: {e}')
+					continue
+				if trace is not None:
+					self.latency.recordHandler(action_id, handlerStart, time.time())
+				handled += 1
+				if response is not None:
+					responses.append({'actionId': action_id, 'targetId': target_id, 'response': response})
+
+			if failed > 0:
+				self.log(f'Compact batch: {failed} of {len(runs)} runs failed for {action_id}')
+
+		# Transit and queue are recorded once for the batch, its handler stage
+		# spans every assignment
+		stages = None
+		if trace is not None and handled > 0:
+			stages = self.latency.finish(trace, commandId, trace.dispatchedAt, time.time(), recordHandler=False)
 
 		if errors:
-			self.sendCommandError(tx, commandId, '; '.join(errors))
+			self.sendCommandError(
+				tx,
+				commandId,
+				'; '.join(message if count == 1 else f'{message} (x{count})' for message, count in errors.items()),
+			)
 		else:
-			self.sendCommandResponse(tx)
+			self.sendCommandResponse(
+				tx,
+				response={'responses': responses} if len(responses) > 0 else None,
+				latency=stages if self.latency.echo else None,
+			)
 
-	def handleIncomingExecTargetAction(self, commandId: str, command: dict, respond: bool = True):
+	def handleIncomingExecTargetAction(
+		self,
+		commandId: str,
+		command: dict,
+		respond: bool = True,
+		receivedAt: float | None = None,
+	):
 		action_data = command.get('action', {})
 		action_id = action_data.get('id', None)
 		target_id = action_data.get('targetId', None)
 		tx = command.get('tx', '')
+		# Queued commands merged into this one are answered along with it
+		txs = commandTxs(command)
+		trace = self.latency.begin(command.get('createdAt', None), receivedAt)
 		created_at = command.get('createdAt', datetime.now(timezone.utc).isoformat())
 		instance_id = command.get('instanceId', None)
 
 		if action_id is None or target_id is None:
 			if respond:
-				self.sendCommandError(tx, commandId, 'Command missing action.id or action.targetId')
+				for replyTx in txs:
+					self.sendCommandError(replyTx, commandId, 'Command missing action.id or action.targetId')
 			else:
 				raise Exception('Command missing action.id or action.targetId')
 			return
@@ -482,7 +888,8 @@ class ExecClient:
 		if action_id not in self.actions:
 			self.log('No action found for id: ' + action_id)
 			if respond:
-				self.sendCommandError(tx, commandId, 'No action found for id: ' + action_id)
+				for replyTx in txs:
+					self.sendCommandError(replyTx, commandId, 'No action found for id: ' + action_id)
 			else:
 				raise Exception('No action found for id: ' + action_id)
 			return
@@ -496,13 +903,17 @@ class ExecClient:
 			data=command.get('data', None),
 		)
 		try:
+			handlerStart = time.time() if trace is not None else 0.0
 			response = self.handleExecTargetAction(c)
+			stages = self.latency.finish(trace, action_id, handlerStart, time.time()) if trace is not None else None
 			if respond:
-				self.sendCommandResponse(tx, response=response)
+				for replyTx in txs:
+					self.sendCommandResponse(replyTx, response=response, latency=stages if self.latency.echo else None)
 		except Exception as e:
 			self.log(f'ExecTargetAction failed for {action_id}: {e}')
 			if respond:
-				self.sendCommandError(tx, commandId, str(e))
+				for replyTx in txs:
+					self.sendCommandError(replyTx, commandId, str(e))
 			else:
 				raise
 
@@ -512,13 +923,19 @@ class ExecClient:
 			self.log('No tx in query response data')
 			return
 
-		handler = self.queryHandlers.get(tx, None)
-		if not handler:
+		subscription = self.subscriptions.get(tx)
+		if subscription is None:
+			# Late responses for replaced or cancelled queries
 			return
-		handler(QueryResponse(data))
+		subscription.responses += 1
+		subscription.handler(QueryResponse(data))
 
 	def parseQueryError(self, data):
 		error = QueryError(data)
+		subscription = self.subscriptions.close(error.tx)
+		if subscription is not None and subscription.onError is not None:
+			subscription.onError(error)
+			return
 		self.log(f"Query error [{error.queryId}] tx={error.tx}: {error.message}")
 
 	def parseReportResponse(self, data):
@@ -526,13 +943,17 @@ class ExecClient:
 		if not tx:
 			self.log('No tx in report response data')
 			return
-		handler = self.reportHandlers.get(tx, None)
-		if not handler:
+		subscription = self.subscriptions.close(tx)
+		if subscription is None:
 			return
-		handler(ReportResponse(data))
+		subscription.handler(ReportResponse(data))
 
 	def parseReportError(self, data):
 		error = ReportError(data)
+		subscription = self.subscriptions.close(error.tx)
+		if subscription is not None and subscription.onError is not None:
+			subscription.onError(error)
+			return
 		self.log(f"Report error [{error.reportId}] tx={error.tx}: {error.message}")
 
 	def handleExecTargetAction(self, command: ExecTargetAction):
@@ -566,17 +987,55 @@ class ExecClient:
 	def saveEmitter(self, emitter: Emitter):
 		self.set(emitter)
 
-	def pulseEmitter(self, emitterId: str, data: any):
+	def pulseEmitter(self, emitterId: str, data: any, force: bool = False):
+		# Drop pulses that repeat the last payload sent, unless this is an explicit resend
+		if not self.pulseFilter.accept(emitterId, data, force=force):
+			return
+
 		p = Pulse(
 			id=emitterId,
 			emitterId=emitterId,
 			data=data,
 		)
-		self.set(p)
+		# Held pulses are only flushed at frame end
+		if self.pulseBatchSize <= 0 or not self.frameDriven:
+			self.set(p)
+			return
+
+		# Latest pulse per emitter wins within a frame
+		self.pendingPulses.pop(emitterId, None)
+		self.pendingPulses[emitterId] = p
+
+	def flushPulses(self):
+		if len(self.pendingPulses) == 0:
+			return
+
+		# One timestamp for every pulse flushed this frame
+		with ENVELOPE.batch():
+			events = [self.buildSetEvent(p) for p in self.pendingPulses.values()]
+		self.pendingPulses.clear()
+
+		batchSize = max(self.pulseBatchSize, 1)
+		for start in range(0, len(events), batchSize):
+			self.sendEventBatch(events[start:start + batchSize])
 
 	def saveHandler(self, actionId: str, handler: Callable[[Action, Dict[str, any]], None]):
 		self.handlers[actionId] = handler
 
+	def beginBuild(self):
+		"""
+		Starts a new registry generation. Actions and handlers saved from here
+		on survive the next sweepRegistries; anything not saved again is dropped.
+		"""
+		self.actions.advance()
+		self.handlers.advance()
+
+	def sweepRegistries(self) -> int:
+		"""
+		Drops actions and handlers the latest build did not register. Returns how many.
+		"""
+		return len(self.actions.sweep()) + len(self.handlers.sweep())
+
 	def removeHandler(self, actionId: str):
 		if actionId in self.handlers:
 			op.RS_LOG.Info('removing handler for', actionId)
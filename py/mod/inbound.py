@@ -0,0 +1,88 @@
+import queue
+import threading
+from typing import Callable, List, Tuple
+
+from traffic import messageBytes
+
+
+# Decoded envelope or None, an error message or None, the message size and its receive time
+DecodeResult = Tuple[dict | None, str | None, int, float]
+
+
+class InboundDecoder:
+	"""
+	Decodes inbound websocket messages on a worker thread. A single worker
+	and FIFO queues keep messages in arrival order; poll() hands decoded
+	envelopes back to the main thread, which is the only place they are
+	dispatched. Small messages skip the thread when nothing is in flight,
+	so ordering still holds and the common case pays no extra frame.
+	"""
+
+	def __init__(self, inlineBytes: int = 16 * 1024):
+		self.enabled = True
+		self.inlineBytes = inlineBytes
+		self.inbox: queue.SimpleQueue = queue.SimpleQueue()
+		self.outbox: queue.SimpleQueue = queue.SimpleQueue()
+		self.pending = 0
+		self.thread: threading.Thread | None = None
+
+	def shouldQueue(self, size: int, frameDriven: bool = True) -> bool:
+		# Without frame callbacks decoded messages would wait for the next message or tick
+		if not self.enabled or not frameDriven:
+			# Anything already in flight must still come out before newer messages
+			return self.pending > 0
+		return self.pending > 0 or size >= self.inlineBytes
+
+	def submit(self, decode: Callable[[any], any], decodeErrors: tuple, message: str | bytes, receivedAt: float):
+		self._ensureThread()
+		self.pending += 1
+		self.inbox.put((decode, decodeErrors, message, receivedAt))
+
+	def poll(self) -> List[DecodeResult]:
+		results = []
+		while True:
+			try:
+				results.append(self.outbox.get_nowait())
+			except queue.Empty:
+				break
+		self.pending -= len(results)
+		return results
+
+	def stop(self):
+		if self.thread is not None:
+			self.inbox.put(None)
+			self.thread = None
+
+	def _ensureThread(self):
+		if self.thread is not None and self.thread.is_alive():
+			return
+		self.thread = threading.Thread(target=self._run, name='rship-inbound-decode', daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		while True:
+			item = self.inbox.get()
+			if item is None:
+				return
+			decode, decodeErrors, message, receivedAt = item
+			d, error = decodeEnvelope(decode, decodeErrors, message)
+			self.outbox.put((d, error, messageBytes(message), receivedAt))
+
+
+def decodeEnvelope(decode: Callable[[any], any], decodeErrors: tuple, message: str | bytes) -> Tuple[dict | None, str | None]:
+	"""
+	Decodes one message and checks it is an {"event": ..., "data": ...} envelope.
+	Safe to call off the main thread: it never touches OPs or logs.
+	"""
+	try:
+		d = decode(message)
+	except decodeErrors as e:
+		return None, 'Error parsing message: ' + str(e)
+	except Exception as e:
+		return None, 'Error parsing message: ' + str(e)
+
+	if not isinstance(d, dict) or not isinstance(d.get('event', None), str):
+		return None, 'Ignoring message without an event'
+	if not isinstance(d.get('data', None), dict):
+		return None, f"Ignoring {d['event']} message without data"
+	return d, None
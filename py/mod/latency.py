@@ -0,0 +1,211 @@
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Tuple
+
+
+# Stages of a command, in order. transit is server emission to receive,
+# queue is receive to dispatch (decode and command queue wait) and handler
+# is the action handler itself.
+STAGES = ('transit', 'queue', 'handler', 'total')
+
+# Histogram bucket upper bounds in ms, growing 25% per bucket from 50 us to about 70 s
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(0.05 * 1.25 ** i for i in range(64))
+
+
+def parseTimestamp(createdAt: any) -> float | None:
+	"""
+	Returns a createdAt stamp as epoch seconds. Accepts ISO 8601 strings and
+	epoch milliseconds; anything else gives None.
+	"""
+	if isinstance(createdAt, (int, float)):
+		return createdAt / 1000.0
+	if not isinstance(createdAt, str) or len(createdAt) == 0:
+		return None
+	try:
+		return datetime.fromisoformat(createdAt.replace('Z', '+00:00')).timestamp()
+	except ValueError:
+		return None
+
+
+class LatencyHistogram:
+	"""
+	Streaming histogram over fixed log-spaced buckets. Percentiles are read
+	back as bucket upper bounds, so they are within 25% of the true value
+	without keeping samples.
+	"""
+
+	__slots__ = ('counts', 'count', 'total', 'largest')
+
+	def __init__(self):
+		self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+		self.count = 0
+		self.total = 0.0
+		self.largest = 0.0
+
+	def record(self, ms: float):
+		ms = max(ms, 0.0)
+		low = 0
+		high = len(BUCKET_BOUNDS)
+		while low < high:
+			middle = (low + high) // 2
+			if BUCKET_BOUNDS[middle] < ms:
+				low = middle + 1
+			else:
+				high = middle
+		self.counts[low] += 1
+		self.count += 1
+		self.total += ms
+		if ms > self.largest:
+			self.largest = ms
+
+	def percentile(self, p: float) -> float:
+		if self.count == 0:
+			return 0.0
+		rank = p * self.count
+		seen = 0
+		for index, count in enumerate(self.counts):
+			seen += count
+			if seen >= rank and count > 0:
+				return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.largest
+		return self.largest
+
+	@property
+	def mean(self) -> float:
+		return self.total / self.count if self.count > 0 else 0.0
+
+
+class ClockOffset:
+	"""
+	Estimates how far the local clock is ahead of the server's from command
+	stamps alone. Each command gives receive time minus createdAt, which is
+	the offset plus its network delay; the smallest value over the recent
+	window is taken as the offset. Transit times are therefore measured
+	against the fastest recent command and exclude its constant delay.
+	"""
+
+	def __init__(self, window: int = 256):
+		self.samples: Deque[float] = deque(maxlen=window)
+		self.estimate: float | None = None
+
+	def observe(self, skew: float) -> float:
+		evicted = self.samples[0] if len(self.samples) == self.samples.maxlen else None
+		self.samples.append(skew)
+		if self.estimate is None or skew < self.estimate:
+			self.estimate = skew
+		elif evicted is not None and evicted <= self.estimate:
+			self.estimate = min(self.samples)
+		return self.estimate
+
+	def reset(self):
+		self.samples.clear()
+		self.estimate = None
+
+
+class CommandTrace:
+	"""
+	Timestamps for one command, in epoch seconds.
+	"""
+
+	__slots__ = ('createdAt', 'receivedAt', 'dispatchedAt')
+
+	def __init__(self, createdAt: float | None, receivedAt: float, dispatchedAt: float):
+		self.createdAt = createdAt
+		self.receivedAt = receivedAt
+		self.dispatchedAt = dispatchedAt
+
+
+class LatencyTracer:
+	"""
+	Per action type histograms of each command stage. The action type is the
+	last part of the action id, e.g. set, resend or bulk_set. A compact batch
+	records its command stages once under CompactBatchTargetAction and only
+	the handler stage for each assignment.
+	"""
+
+	def __init__(self):
+		self.enabled = True
+		# Adds the measured stages to command responses when set
+		self.echo = False
+		self.clock = ClockOffset()
+		self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+	def begin(self, createdAt: any, receivedAt: float | None) -> CommandTrace | None:
+		if not self.enabled:
+			return None
+		now = time.time()
+		return CommandTrace(parseTimestamp(createdAt), now if receivedAt is None else receivedAt, now)
+
+	def _histograms(self, actionId: str) -> Dict[str, LatencyHistogram]:
+		actionType = actionId.rsplit(':', 1)[-1]
+		histograms = self.histograms.get(actionType, None)
+		if histograms is None:
+			histograms = self.histograms[actionType] = {stage: LatencyHistogram() for stage in STAGES}
+		return histograms
+
+	def finish(
+		self,
+		trace: CommandTrace | None,
+		actionId: str,
+		handlerStart: float,
+		handlerEnd: float,
+		recordHandler: bool = True,
+	) -> Dict[str, float] | None:
+		"""
+		Records one handled command. Returns its stages in ms. Call once per
+		command: each call feeds the clock offset estimate.
+		"""
+		if trace is None:
+			return None
+
+		stages = {
+			'queue': (trace.dispatchedAt - trace.receivedAt) * 1000.0,
+			'handler': (handlerEnd - handlerStart) * 1000.0,
+		}
+		start = trace.receivedAt
+		if trace.createdAt is not None:
+			offset = self.clock.observe(trace.receivedAt - trace.createdAt)
+			stages['transit'] = (trace.receivedAt - trace.createdAt - offset) * 1000.0
+			start = trace.createdAt + offset
+		stages['total'] = (handlerEnd - start) * 1000.0
+
+		histograms = self._histograms(actionId)
+		for stage, ms in stages.items():
+			if recordHandler or stage != 'handler':
+				histograms[stage].record(ms)
+		return stages
+
+	def recordHandler(self, actionId: str, handlerStart: float, handlerEnd: float):
+		"""
+		Records only the handler stage, for actions run inside a batch.
+		"""
+		if self.enabled:
+			self._histograms(actionId)['handler'].record((handlerEnd - handlerStart) * 1000.0)
+
+	def summary(self, stage: str = 'total') -> Tuple[int, float, float, float]:
+		"""
+		Returns (count, p50, p95, p99) in ms for a stage across every action type.
+		"""
+		merged = LatencyHistogram()
+		for histograms in self.histograms.values():
+			histogram = histograms[stage]
+			for index, count in enumerate(histogram.counts):
+				merged.counts[index] += count
+			merged.count += histogram.count
+			merged.total += histogram.total
+			merged.largest = max(merged.largest, histogram.largest)
+		return merged.count, merged.percentile(0.5), merged.percentile(0.95), merged.percentile(0.99)
+
+	def rows(self) -> List[Tuple[str, str, int, float, float, float, float]]:
+		"""
+		Returns (action type, stage, count, mean, p50, p95, p99) for every histogram.
+		"""
+		return [
+			(actionType, stage, h.count, h.mean, h.percentile(0.5), h.percentile(0.95), h.percentile(0.99))
+			for actionType, histograms in self.histograms.items()
+			for stage, h in histograms.items()
+		]
+
+	def reset(self):
+		self.clock.reset()
+		self.histograms.clear()
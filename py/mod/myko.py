@@ -1,6 +1,8 @@
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from enum import Enum
-from typing import List
+from itertools import count
+from typing import Dict, List
 from uuid import uuid4
 
 
@@ -8,18 +10,79 @@ def iso_now() -> str:
 	return datetime.now(timezone.utc).isoformat()
 
 
+class EnvelopeFactory:
+	"""
+	Mints tx ids and createdAt stamps for outgoing envelopes.
+	Tx ids keep the UUID shape: a random per-instance prefix with a counter in
+	the last 12 hex digits. Inside batch() every envelope shares one timestamp.
+	"""
+
+	def __init__(self):
+		self.prefix = str(uuid4())[:24]
+		self.counter = count(1)
+		self.batchTimestamp: str | None = None
+
+	def nextTx(self) -> str:
+		return f"{self.prefix}{next(self.counter) & 0xFFFFFFFFFFFF:012x}"
+
+	def timestamp(self) -> str:
+		return self.batchTimestamp or iso_now()
+
+	@contextmanager
+	def batch(self):
+		outermost = self.batchTimestamp is None
+		if outermost:
+			self.batchTimestamp = iso_now()
+		try:
+			yield self.batchTimestamp
+		finally:
+			if outermost:
+				self.batchTimestamp = None
+
+
+ENVELOPE = EnvelopeFactory()
+
+
 class MEventType(Enum):
 	SET = 'SET'
 	DEL = 'DEL'
 
 
+# Rendered once instead of per event
+CHANGE_TYPES: Dict[MEventType, str] = {changeType: changeType.value for changeType in MEventType}
+
+
 class MItem:
+	"""
+	Base for every item sent to the server. Subclasses declare their fields in
+	__slots__ and list the ones that must stay local in WIRE_EXCLUDE; the wire
+	field order is computed once per class.
+	"""
+
+	__slots__ = ('id', 'name')
+	WIRE_EXCLUDE: tuple = ()
+	WIRE_FIELDS: tuple = ('id', 'name')
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		fields = []
+		for klass in reversed(cls.__mro__):
+			for field in klass.__dict__.get('__slots__', ()):
+				if field not in fields:
+					fields.append(field)
+		cls.WIRE_FIELDS = tuple(field for field in fields if field not in cls.WIRE_EXCLUDE)
+
 	def __init__(self, id: str, name: str):
 		self.id = id
 		self.name = name
 
+	def to_wire(self) -> dict:
+		return {field: getattr(self, field) for field in self.WIRE_FIELDS}
+
 
 class MEvent:
+	__slots__ = ('changeType', 'item', 'itemType', 'createdAt', 'tx', 'sourceId', 'options')
+
 	def __init__(
 		self,
 		changeType: MEventType,
@@ -30,14 +93,26 @@ class MEvent:
 		sourceId: str | None = None,
 		options: dict | None = None,
 	):
-		self.changeType = changeType.value
-		self.item = item if isinstance(item, dict) else item.__dict__
+		self.changeType = CHANGE_TYPES[changeType]
+		self.item = item if isinstance(item, dict) else item.to_wire()
 		self.itemType = itemType or type(item).__name__
-		self.createdAt = createdAt or iso_now()
-		self.tx = tx or str(uuid4())
+		self.createdAt = createdAt or ENVELOPE.timestamp()
+		self.tx = tx or ENVELOPE.nextTx()
 		self.sourceId = sourceId
-		if options is not None:
-			self.options = options
+		self.options = options
+
+	def to_wire(self) -> dict:
+		wire = {
+			'changeType': self.changeType,
+			'item': self.item,
+			'itemType': self.itemType,
+			'createdAt': self.createdAt,
+			'tx': self.tx,
+			'sourceId': self.sourceId,
+		}
+		if self.options is not None:
+			wire['options'] = self.options
+		return wire
 
 
 class MWrappedItem:
@@ -58,20 +133,20 @@ class QueryChange:
 
 class WSEvent:
 	def __init__(self, data: MEvent):
-		self.data = data.__dict__
+		self.data = data.to_wire()
 		self.event = 'ws:m:event'
 
 
 class WSEventBatch:
 	def __init__(self, data: List[MEvent]):
-		self.data = [event.__dict__ for event in data]
+		self.data = [event.to_wire() for event in data]
 		self.event = 'ws:m:event-batch'
 
 
 class MQuery:
 	def __init__(self) -> None:
-		self.tx = str(uuid4())
-		self.createdAt = iso_now()
+		self.tx = ENVELOPE.nextTx()
+		self.createdAt = ENVELOPE.timestamp()
 
 
 class MWrappedQuery:
@@ -83,8 +158,8 @@ class MWrappedQuery:
 
 class MReport:
 	def __init__(self) -> None:
-		self.tx = str(uuid4())
-		self.createdAt = iso_now()
+		self.tx = ENVELOPE.nextTx()
+		self.createdAt = ENVELOPE.timestamp()
 
 
 class MWrappedReport:
@@ -113,8 +188,8 @@ class WSReport:
 
 class MCommand:
 	def __init__(self, createdAt: str | None = None, tx: str | None = None):
-		self.tx = tx or str(uuid4())
-		self.createdAt = createdAt or iso_now()
+		self.tx = tx or ENVELOPE.nextTx()
+		self.createdAt = createdAt or ENVELOPE.timestamp()
 
 
 class MWrappedCommand:
@@ -1,12 +1,81 @@
+import hashlib
 from datetime import datetime, timezone
 from uuid import uuid4
-from page_target import PageTarget
+from page_target import PageTarget, applyBulkSet, bulkSetResponse
+from par_writes import PAR_WRITES
 from typing import Dict, List
 from target import TouchTarget
-from exec import Action, Target,Instance,Stream
-from util import RS_BUNDLE_COMPLETE_PAR, RS_TARGET_ID_PAR, RS_TARGET_ID_STORAGE_KEY, RS_TARGET_INFO_PAGE
+from exec import Action, Emitter, Target,Instance,Stream
+from util import RS_BUNDLE_COMPLETE_PAR, RS_EMITTER_MAX_RATE_PAR, RS_TARGET_ID_PAR, RS_TARGET_ID_STORAGE_KEY, RS_TARGET_INFO_PAGE
+
+
+
+def _pageFingerprint(page) -> tuple:
+    """
+    Everything a PageTarget and its schema are built from: par order, styles,
+    labels, headers, menus and sequence block counts. Par values are left out
+    since they are read live.
+    """
+    pars = []
+    for par in page.pars:
+        parGroup = getattr(par, "parGroup", None)
+        sequence = getattr(parGroup, "sequence", None)
+        entry = (
+            par.name,
+            par.style,
+            par.label,
+            parGroup.name if parGroup is not None else None,
+            parGroup.size if parGroup is not None else None,
+            sequence.name if sequence is not None else None,
+            len(sequence.blocks) if sequence is not None else None,
+        )
+        if par.style in ("Menu", "StrMenu"):
+            entry += (tuple(par.menuNames), tuple(par.menuLabels))
+        pars.append(entry)
+    return (page.name, tuple(pars))
+
+
+def structuralFingerprint(ownerComp) -> str:
+    """
+    Hashes the structure of an OP that its OPTarget is built from, so an
+    unchanged OP can keep its OPTarget across refreshes.
+    """
+    parts = [
+        ownerComp.id,
+        ownerComp.path,
+        ownerComp.name,
+        ownerComp.OPType,
+        ownerComp.storage.get(RS_TARGET_ID_STORAGE_KEY, None),
+        tuple(sorted(ownerComp.tags)),
+    ]
+
+    if "rship_stream" in ownerComp.tags and "COMP" in ownerComp.opType:
+        parts.append(ownerComp.par.opviewer.eval())
+
+    for page in ownerComp.customPages:
+        if page.name == RS_TARGET_INFO_PAGE:
+            continue
+        parts.append(_pageFingerprint(page))
+
+    if "Notch" in ownerComp.pages:
+        parts.append(_pageFingerprint(ownerComp.pages["Notch"]))
+
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
 
 
+class OPTargetItems:
+    """
+    The rship items an OPTarget produces, built once and reused until the OP changes.
+    """
+
+    __slots__ = ("touchTargets", "targets", "actions", "emitters")
+
+    def __init__(self, touchTargets: List[TouchTarget], targets: List[Target], actions: List[Action], emitters: List[Emitter]):
+        self.touchTargets = touchTargets
+        self.targets = targets
+        self.actions = actions
+        self.emitters = emitters
+
 
 class OPTarget(TouchTarget):
 
@@ -16,6 +85,8 @@ class OPTarget(TouchTarget):
         self.pageTargets: Dict[str, PageTarget] = {}
         self.streamInfo: Stream | None = None
         self.streamSource: str | None = None
+        self.path = ownerComp.path
+        self._items: OPTargetItems | None = None
 
 
         op.RS_LOG.Debug("[OPTarget]: Initializing OPTarget at " + ownerComp.path)
@@ -23,6 +94,7 @@ class OPTarget(TouchTarget):
         self.buildPageTargets()
         self.organizePars()
         self.buildStream()
+        self.fingerprint = structuralFingerprint(ownerComp)
 
 
     @property
@@ -40,9 +112,21 @@ class OPTarget(TouchTarget):
         newId = str(uuid4())
         self.ownerComp.storage[RS_TARGET_ID_STORAGE_KEY] = newId
         self.pageTargets = {}
+        self._items = None
         self.buildPageTargets()
         self.buildStream()
+        self.fingerprint = structuralFingerprint(self.ownerComp)
         return newId
+
+    def isCurrent(self, fingerprint: str, instance: Instance) -> bool:
+        """
+        True if this OPTarget was built from the same OP structure and instance,
+        and the pars it holds still exist. A par re-created with the same shape
+        keeps the fingerprint but leaves the old Par objects invalid.
+        """
+        if self.fingerprint != fingerprint or self.instance is not instance:
+            return False
+        return all(pageTarget.parsValid() for pageTarget in self.pageTargets.values())
     
 
     def ensureUtilPars(self):
@@ -64,6 +148,13 @@ class OPTarget(TouchTarget):
         if RS_BUNDLE_COMPLETE_PAR not in page.pars:
             page.appendPulse(RS_BUNDLE_COMPLETE_PAR, label="All Op Pars Updated")
 
+        if RS_EMITTER_MAX_RATE_PAR not in page.pars:
+            maxRatePar = page.appendFloat(RS_EMITTER_MAX_RATE_PAR, label="Emitter Max Rate (Hz)")[0]
+            maxRatePar.min = 0
+            maxRatePar.clampMin = True
+            maxRatePar.normMax = 60
+            maxRatePar.help = "Max pulses per second for this target's emitters. 0 uses the rship default."
+
         bundleCompletePar = self.ownerComp.par[RS_BUNDLE_COMPLETE_PAR]
 
         bundleCompletePar.startSection = True
@@ -80,7 +171,7 @@ class OPTarget(TouchTarget):
 
         page = self.ownerComp.customPages[RS_TARGET_INFO_PAGE]
 
-        configParNames = [RS_TARGET_ID_PAR, RS_BUNDLE_COMPLETE_PAR, *[p.bulkUpdatedName for p in self.pageTargets.values() if p.page.name != RS_TARGET_INFO_PAGE]]
+        configParNames = [RS_TARGET_ID_PAR, RS_EMITTER_MAX_RATE_PAR, RS_BUNDLE_COMPLETE_PAR, *[p.bulkUpdatedName for p in self.pageTargets.values() if p.page.name != RS_TARGET_INFO_PAGE]]
 
         for par in page.pars:
             if par.name not in configParNames:
@@ -92,6 +183,22 @@ class OPTarget(TouchTarget):
             page.pars[1].startSection = True
             page.pars[2].startSection = True
 
+    def getEmitterMaxRate(self) -> float | None:
+        """
+        Returns the per-target emitter rate override, or None to use the rship default.
+        Read on every pulse, so changes apply without a rebuild.
+        """
+        if not self.ownerComp.valid:
+            return None
+        maxRatePar = self.ownerComp.par[RS_EMITTER_MAX_RATE_PAR]
+        if maxRatePar is None:
+            return None
+
+        maxRate = float(maxRatePar.eval())
+        if maxRate <= 0:
+            return None
+        return maxRate
+
     def buildStream(self):
 
         if "rship_stream" not in self.ownerComp.tags:
@@ -138,34 +245,24 @@ class OPTarget(TouchTarget):
 
     def getActions(self):
 
+        # Par names are unique within a COMP, so the page maps never overlap
+        setters = {}
+        for page in self.pageTargets.values():
+            setters.update(page.buildSetters())
+
         def bulk_set_action_handler(action: Action, data: Dict[str, any]):
-            op.RS_LOG.Debug(f"[OPTarget]: Handling bulk set action for {self.id}")
-            op.RS_LOG.Debug("Data received:", data)
-
-            for page in self.pageTargets.values():
-                for par in page.parGroupTargets.values():
-                    if par.parShape is None:
-                        continue
-
-                    if par.parGroup.name in data:
-                        value = data.get(par.parGroup.name, None)
-                        if value is None:
-                            op.RS_LOG.Debug(f"Skipping {par.parGroup.name} on {page.name} as no value provided")
-                            continue
-                        par.parShape.setData(value)
-                    op.RS_LOG.Debug(f"Setting {par.parGroup.name} to {value} on {page.page.name}")
-                for sequenceTarget in page.sequenceTargets.values():
-                    value = data.get(sequenceTarget.sequence.name, None)
-                    if value is None:
-                        continue
-                    sequenceTarget.parShape.setData(value)
-                    op.RS_LOG.Debug(f"Setting sequence {sequenceTarget.sequence.name} on {page.page.name}")
+            op.RS_LOG.Debug(f"[OPTarget]: Handling bulk set action for {self.id} with {len(data)} keys")
+
+            unknownKeys = applyBulkSet(setters, data)
+            if len(unknownKeys) > 0:
+                op.RS_LOG.Debug(f"[OPTarget]: Unknown bulk set keys on {self.ownerComp.path}: {unknownKeys}")
+
             opCompletePulse = self.ownerComp.par[RS_BUNDLE_COMPLETE_PAR]
             if not opCompletePulse.isPulse:
                 op.RS_LOG.Debug(f"[OPTarget]: {RS_BUNDLE_COMPLETE_PAR} is not a pulse parameter, cannot pulse.")
-                return
-            opCompletePulse.pulse()
-            pass
+                return bulkSetResponse(unknownKeys)
+            PAR_WRITES.pulse(self.ownerComp, RS_BUNDLE_COMPLETE_PAR)
+            return bulkSetResponse(unknownKeys)
 
 
         orderedEntries = []
@@ -197,7 +294,8 @@ class OPTarget(TouchTarget):
             targetId=self.id,
             schema=schema,
             schemaLayout=schemaLayout,
-            serviceId=self.instance.serviceId
+            serviceId=self.instance.serviceId,
+            mergeable=True,
         )
 
 
@@ -227,4 +325,19 @@ class OPTarget(TouchTarget):
             children.extend(t.collectChildren())
         return children
 
+    def collectItems(self) -> OPTargetItems:
+        """
+        Returns the targets, actions and emitters of this OP and all its children.
+        Built on first use; a structural change produces a new OPTarget instead.
+        """
+        if self._items is None:
+            touchTargets = self.collectChildren()
+            self._items = OPTargetItems(
+                touchTargets,
+                [t.getTarget() for t in touchTargets],
+                [action for t in touchTargets for action in t.getActions()],
+                [emitter for t in touchTargets for emitter in t.getEmitters()],
+            )
+        return self._items
+
 
@@ -0,0 +1,167 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+
+# (item type, item id, encoded size) for events over the batch byte limit
+OversizedNote = Tuple[str, str, int]
+
+
+def encodeEventMessages(
+	codec,
+	wires: Iterable[dict],
+	maxBatchBytes: int,
+	maxBatchEvents: int,
+	onOversized: Callable[[OversizedNote], None],
+) -> Iterator[Tuple[str | bytes, int]]:
+	"""
+	Encodes each event once and joins them into messages bounded by
+	maxBatchBytes and maxBatchEvents (0 means unbounded). Yields
+	(message, eventCount). Pure, so it can run on a worker thread.
+	"""
+	chunk = []
+	chunkBytes = 0
+
+	def wrapChunk():
+		if len(chunk) == 1:
+			return codec.wrap(eventMessageKind(1), chunk[0])
+		return codec.wrapList(eventMessageKind(len(chunk)), chunk)
+
+	for wire in wires:
+		encoded = codec.encode(wire)
+		size = codec.sizeOf(encoded)
+
+		if maxBatchBytes > 0 and size > maxBatchBytes:
+			onOversized((wire.get('itemType', ''), wire.get('item', {}).get('id', ''), size))
+
+		full = maxBatchEvents > 0 and len(chunk) >= maxBatchEvents
+		tooBig = maxBatchBytes > 0 and chunkBytes + size > maxBatchBytes
+		if len(chunk) > 0 and (full or tooBig):
+			yield wrapChunk(), len(chunk)
+			chunk = []
+			chunkBytes = 0
+
+		chunk.append(encoded)
+		chunkBytes += size + 1
+
+	if len(chunk) > 0:
+		yield wrapChunk(), len(chunk)
+
+
+def eventMessageKind(eventCount: int) -> str:
+	return 'ws:m:event' if eventCount == 1 else 'ws:m:event-batch'
+
+
+class EncodedJob:
+	__slots__ = ('generation', 'eventCount', 'messages', 'kinds', 'oversized', 'error')
+
+	def __init__(
+		self,
+		generation: int,
+		eventCount: int,
+		messages: List[str | bytes],
+		kinds: List[str | None],
+		oversized: List[OversizedNote],
+		error: str | None = None,
+	):
+		self.generation = generation
+		self.eventCount = eventCount
+		self.messages = messages
+		# Event name of each message, for traffic metering
+		self.kinds = kinds
+		self.oversized = oversized
+		self.error = error
+
+
+class OutboundSerializer:
+	"""
+	Encodes outbound messages on a worker thread. The main thread only builds
+	the plain wire data and later sends the finished messages, which come back
+	from take() in submission order. A single worker and FIFO queues keep
+	ordering; while anything is in flight every send has to go through here.
+	"""
+
+	def __init__(self):
+		self.enabled = False
+		self.inbox: queue.SimpleQueue = queue.SimpleQueue()
+		self.outbox: queue.SimpleQueue = queue.SimpleQueue()
+		self.pending = 0
+		self.pendingEvents = 0
+		# Bumped by clear() so work submitted before a disconnect is never sent
+		self.generation = 0
+		self.thread: threading.Thread | None = None
+
+	def shouldQueue(self, frameDriven: bool = True) -> bool:
+		"""
+		Finished messages are sent by pumps at frame start and end, so new work
+		only goes to the worker while those run. Anything in flight still has
+		to come out before newer messages.
+		"""
+		return (self.enabled and frameDriven) or self.pending > 0
+
+	def submitPayload(self, codec, payload: dict):
+		self._submit(('payload', codec, payload, 0, 0), 1)
+
+	def submitEvents(self, codec, wires: List[dict], maxBatchBytes: int, maxBatchEvents: int):
+		self._submit(('events', codec, wires, maxBatchBytes, maxBatchEvents), len(wires))
+
+	def take(self) -> List[EncodedJob]:
+		jobs = []
+		while True:
+			try:
+				job = self.outbox.get_nowait()
+			except queue.Empty:
+				break
+			self.pending -= 1
+			self.pendingEvents -= job.eventCount
+			if job.generation == self.generation:
+				jobs.append(job)
+		return jobs
+
+	def clear(self):
+		"""
+		Forgets finished and in-flight work, e.g. after the socket drops. Jobs the
+		worker finishes later are dropped by take().
+		"""
+		self.generation += 1
+		self.take()
+
+	def stop(self):
+		if self.thread is not None:
+			self.inbox.put(None)
+			self.thread = None
+
+	def _submit(self, job: tuple, eventCount: int):
+		self._ensureThread()
+		self.pending += 1
+		self.pendingEvents += eventCount
+		self.inbox.put((self.generation, eventCount) + job)
+
+	def _ensureThread(self):
+		if self.thread is not None and self.thread.is_alive():
+			return
+		self.thread = threading.Thread(target=self._run, name='rship-outbound-encode', daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		while True:
+			job = self.inbox.get()
+			if job is None:
+				return
+			generation, eventCount, kind, codec, data, maxBatchBytes, maxBatchEvents = job
+			oversized = []
+			try:
+				if kind == 'payload':
+					messages = [codec.encode(data)]
+					kinds = [data.get('event', None)]
+				else:
+					messages = []
+					kinds = []
+					for message, count in encodeEventMessages(codec, data, maxBatchBytes, maxBatchEvents, oversized.append):
+						messages.append(message)
+						kinds.append(eventMessageKind(count))
+			except Exception as e:
+				# Reported on the main thread; the worker must survive to keep later jobs flowing
+				self.outbox.put(EncodedJob(generation, eventCount, [], [], oversized, error=str(e)))
+				continue
+			self.outbox.put(EncodedJob(generation, eventCount, messages, kinds, oversized))
@@ -2,10 +2,34 @@ from datetime import datetime, timezone
 from par_group_target import ParGroupTarget
 from sequence_target import SequenceTarget
 from exec import Target, TargetStatus, Action, Emitter, Instance
-from typing import Dict, List
+from par_writes import PAR_WRITES
+from typing import Callable, Dict, List
 from target import TouchTarget
 from util import RS_TARGET_INFO_PAGE
 
+
+def applyBulkSet(setters: Dict[str, Callable[[any], any]], data: Dict[str, any]) -> List[str]:
+    """
+    Calls the setter for each key in the payload. Only keys present in data are
+    visited; None values are skipped. Returns the keys that have no setter.
+    """
+    unknownKeys = []
+    for key, value in data.items():
+        setter = setters.get(key, None)
+        if setter is None:
+            unknownKeys.append(key)
+            continue
+        if value is None:
+            continue
+        setter(value)
+    return unknownKeys
+
+
+def bulkSetResponse(unknownKeys: List[str]) -> Dict[str, any] | None:
+    if len(unknownKeys) == 0:
+        return None
+    return {"unknownKeys": unknownKeys}
+
 class PageTarget(TouchTarget):
 
     def __init__(self, parentId: str, ownerComp: OP, page: Page, instance: Instance):
@@ -51,33 +75,21 @@ class PageTarget(TouchTarget):
         Returns a list of actions that can be performed on this target.
         """
 
+        setters = self.buildSetters()
+
         def bulk_set_action_handler(action: Action, data: Dict[str, any]):
-            op.RS_LOG.Debug(f"[OPTarget]: Handling bulk set action for {self.id}")
-            op.RS_LOG.Debug("Data received:", data)
+            op.RS_LOG.Debug(f"[PageTarget]: Handling bulk set action for {self.id} with {len(data)} keys")
 
-            for par in self.parGroupTargets.values():
-                if par.parShape is None:
-                    continue
+            unknownKeys = applyBulkSet(setters, data)
+            if len(unknownKeys) > 0:
+                op.RS_LOG.Debug(f"[PageTarget]: Unknown bulk set keys on {self.page.name}: {unknownKeys}")
 
-                if par.parGroup.name in data:
-                    value = data.get(par.parGroup.name, None)
-                    if value is None:
-                        op.RS_LOG.Debug(f"Skipping {par.parGroup.name} on {self.page.name} as no value provided")
-                        continue
-                    par.parShape.setData(value)
-                op.RS_LOG.Debug(f"Setting {par.parGroup.name} to {value} on {self.page.name}")
-            for sequenceTarget in self.sequenceTargets.values():
-                value = data.get(sequenceTarget.sequence.name, None)
-                if value is None:
-                    continue
-                sequenceTarget.parShape.setData(value)
-                op.RS_LOG.Debug(f"Setting sequence {sequenceTarget.sequence.name} on {self.page.name}")
             opCompletePulse = self.ownerComp.par[self.bulkUpdatedName]
             if not opCompletePulse.isPulse:
                 op.RS_LOG.Warning(f"[PageTarget]: {self.bulkUpdatedName} is not a pulse parameter, cannot pulse.")
-                return
-            opCompletePulse.pulse()
-            pass
+                return bulkSetResponse(unknownKeys)
+            PAR_WRITES.pulse(self.ownerComp, self.bulkUpdatedName)
+            return bulkSetResponse(unknownKeys)
 
 
         orderedEntries = self.buildBulkSchemaEntries()
@@ -104,7 +116,8 @@ class PageTarget(TouchTarget):
             targetId=self.id,
             schema=schema,
             schemaLayout=schemaLayout,
-            serviceId=self.instance.serviceId
+            serviceId=self.instance.serviceId,
+            mergeable=True,
         )
 
         allActions = [bulk_set_action] 
@@ -117,6 +130,31 @@ class PageTarget(TouchTarget):
         allEmitters = []
         return allEmitters
     
+    def parsValid(self) -> bool:
+        """
+        False if a par group this page's targets hold has been deleted, even if
+        one with the same shape was created in its place.
+        """
+        for parGroupTarget in self.parGroupTargets.values():
+            if not parGroupTarget.parGroup.valid:
+                return False
+        for sequenceTarget in self.sequenceTargets.values():
+            if not all(parGroup.valid for parGroup in sequenceTarget.parShape.sequenceParGroups):
+                return False
+        return True
+
+    def buildSetters(self) -> Dict[str, Callable[[any], any]]:
+        """
+        Maps each bulk_set key on this page to the setter of its par or sequence.
+        """
+        setters = {}
+        for name, parGroupTarget in self.parGroupTargetsByName.items():
+            if parGroupTarget.parShape is not None:
+                setters[name] = parGroupTarget.parShape.setData
+        for name, sequenceTarget in self.sequenceTargetsByName.items():
+            setters[name] = sequenceTarget.parShape.setData
+        return setters
+
     def buildParGroupTargets(self):
         seenSequences = set()
         for par in self.page.parGroups:
@@ -167,7 +205,7 @@ class PageTarget(TouchTarget):
                 path = parGroup.sequence.name
                 target = self.sequenceTargetsByName.get(path, None)
                 label = getattr(parGroup.sequence, "label", None) or path
-                schemaNode = target.parShape.buildSchemaProperties() if target is not None else None
+                schemaNode = target.parShape.schemaProperties() if target is not None else None
             else:
                 path = parGroup.name
                 target = self.parGroupTargetsByName.get(path, None)
@@ -177,7 +215,7 @@ class PageTarget(TouchTarget):
                 else:
                     schemaNode = {
                         "type": "object",
-                        "properties": target.parShape.buildSchemaProperties(),
+                        "properties": target.parShape.schemaProperties(),
                     }
 
             if path in seenPaths or schemaNode is None:
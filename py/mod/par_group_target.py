@@ -17,8 +17,6 @@ class ParGroupTarget(TouchTarget):
         self.parShape = buildShape( ownerComp, parGroup)
         op.RS_LOG.Debug(f"[ParGroupTarget]: Initializing ParGroupTarget for {self.parGroup.name} at {self.ownerComp.path}")
 
-        op.RS_LOG.Debug("SCHEMA", self.parShape.buildSchemaProperties())
-
     @property
     def id(self) -> str:
         return f"{self.opTargetId}:{self.parGroup.name}"
@@ -44,7 +42,7 @@ class ParGroupTarget(TouchTarget):
 
         schema = {
             "type": "object",
-            "properties": self.parShape.buildSchemaProperties()
+            "properties": self.parShape.schemaProperties()
         }
 
         def handleSetAction(action: Action, data: Dict[str, any]):
@@ -56,11 +54,13 @@ class ParGroupTarget(TouchTarget):
             targetId=self.id,
             schema=schema,
             serviceId=self.instance.serviceId,
-            handler=handleSetAction
+            handler=handleSetAction,
+            # Every pulse must reach the par, so pulse sets are never merged
+            mergeable=not self.parShape.isMomentary,
         )
 
         def handleResendAction(action: Action, data: Dict[str, any]):
-            CLIENT.pulseEmitter(f"{self.id}:updated", self.parShape.buildData())
+            CLIENT.pulseEmitter(f"{self.id}:updated", self.parShape.buildData(), force=True)
             return
         
 
@@ -82,7 +82,7 @@ class ParGroupTarget(TouchTarget):
 
         schema = {
             "type": "object",
-            "properties": self.parShape.buildSchemaProperties()
+            "properties": self.parShape.schemaProperties()
         }
 
         setEmitter = Emitter(
@@ -3,8 +3,78 @@ from typing import Dict, List
 
 from td import OP, ParGroup
 
+from par_writes import PAR_WRITES
+from timing import PHASE_TIMER
+
+
+SCHEMA_CACHE_MAX_ENTRIES = 4096
+
+
+class FrozenDict(dict):
+    """
+    A dict that refuses mutation, so cached schema nodes can be shared safely.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Cached schema nodes are shared and cannot be modified")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+
+def freezeSchema(node: any) -> any:
+    if isinstance(node, dict):
+        return FrozenDict({key: freezeSchema(value) for key, value in node.items()})
+    if isinstance(node, list):
+        return tuple(freezeSchema(value) for value in node)
+    return node
+
+
+class SchemaCache:
+    """
+    Shares schema properties between ParShapes with the same signature.
+    The signature covers everything the schema is built from, so a changed
+    parGroup definition produces a new key instead of a stale hit.
+    """
+
+    def __init__(self):
+        self.entries: Dict[tuple, FrozenDict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, shape: "ParShape") -> FrozenDict:
+        signature = shape.schemaSignature()
+        node = self.entries.get(signature, None)
+        if node is not None:
+            self.hits += 1
+            return node
+
+        self.misses += 1
+        if len(self.entries) >= SCHEMA_CACHE_MAX_ENTRIES:
+            self.entries.clear()
+        with PHASE_TIMER.span('schema'):
+            node = freezeSchema(shape.buildSchemaProperties())
+        self.entries[signature] = node
+        return node
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+SCHEMA_CACHE = SchemaCache()
+
 
 class ParShape(ABC):
+    # Momentary shapes emit the same payload for every event, so pulses are only deduped within a frame
+    isMomentary = False
+
     @abstractmethod
     def buildData(self) -> Dict[str, any]:
         """
@@ -26,6 +96,23 @@ class ParShape(ABC):
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def schemaSignature(self) -> tuple:
+        """
+        Returns a hashable key describing everything buildSchemaProperties depends on.
+        """
+        return (
+            type(self).__name__,
+            self.parGroup.style,
+            self.parGroup.size,
+            tuple(self.parGroup.subLabel),
+        )
+
+    def schemaProperties(self) -> Dict[str, any]:
+        """
+        Returns the shared, read-only schema properties for this ParShape.
+        """
+        return SCHEMA_CACHE.get(self)
+
 
 class FloatParShape(ParShape):
     def __init__(self, ownerComp: OP, parGroup: ParGroup):
@@ -61,10 +148,10 @@ class FloatParShape(ParShape):
         if self.parGroup.size > 1:
             for i in self.parGroup.subLabel:
                 if i in data:
-                    self.ownerComp.par[i] = data[i]
+                    PAR_WRITES.write(self.ownerComp, i, data[i])
         else:
             if "value" in data:
-                self.ownerComp.par[self.parGroup.name] = data["value"]
+                PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 class IntParShape(ParShape):
@@ -95,10 +182,10 @@ class IntParShape(ParShape):
         if self.parGroup.size > 1:
             for i in self.parGroup.subLabel:
                 if i in data:
-                    self.ownerComp.par[i] = data[i]
+                    PAR_WRITES.write(self.ownerComp, i, data[i])
         else:
             if "value" in data:
-                self.ownerComp.par[self.parGroup.name] = data["value"]
+                PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 class StrParShape(ParShape):
@@ -114,7 +201,7 @@ class StrParShape(ParShape):
 
     def setData(self, data: Dict[str, any]):
         if "value" in data:
-            self.ownerComp.par[self.parGroup.name] = data["value"]
+            PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 class ToggleParShape(ParShape):
@@ -130,10 +217,12 @@ class ToggleParShape(ParShape):
 
     def setData(self, data: Dict[str, any]):
         if "value" in data:
-            self.ownerComp.par[self.parGroup.name] = data["value"]
+            PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 class PulseParShape(ParShape):
+    isMomentary = True
+
     def __init__(self, ownerComp: OP, parGroup: ParGroup):
         self.parGroup = parGroup
         self.ownerComp = ownerComp
@@ -145,7 +234,7 @@ class PulseParShape(ParShape):
         return {"value": {"type": "null"}}
 
     def setData(self, data: Dict[str, any]):
-        self.ownerComp.par[self.parGroup.name].pulse()
+        PAR_WRITES.pulse(self.ownerComp, self.parGroup.name)
 
 
 class WHParShape(ParShape):
@@ -166,9 +255,9 @@ class WHParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "w" in data:
-            self.ownerComp.par[parName + "w"] = data["w"]
+            PAR_WRITES.write(self.ownerComp, parName + "w", data["w"])
         if "h" in data:
-            self.ownerComp.par[parName + "h"] = data["h"]
+            PAR_WRITES.write(self.ownerComp, parName + "h", data["h"])
 
 
 class XYParShape(ParShape):
@@ -189,9 +278,9 @@ class XYParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "x" in data:
-            self.ownerComp.par[parName + "x"] = data["x"]
+            PAR_WRITES.write(self.ownerComp, parName + "x", data["x"])
         if "y" in data:
-            self.ownerComp.par[parName + "y"] = data["y"]
+            PAR_WRITES.write(self.ownerComp, parName + "y", data["y"])
 
 
 class XYZParShape(ParShape):
@@ -217,11 +306,11 @@ class XYZParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "x" in data:
-            self.ownerComp.par[parName + "x"] = data["x"]
+            PAR_WRITES.write(self.ownerComp, parName + "x", data["x"])
         if "y" in data:
-            self.ownerComp.par[parName + "y"] = data["y"]
+            PAR_WRITES.write(self.ownerComp, parName + "y", data["y"])
         if "z" in data:
-            self.ownerComp.par[parName + "z"] = data["z"]
+            PAR_WRITES.write(self.ownerComp, parName + "z", data["z"])
 
 
 class XYZWParShape(ParShape):
@@ -281,13 +370,13 @@ class XYZWParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "x" in data:
-            self.ownerComp.par[parName + "x"] = data["x"]
+            PAR_WRITES.write(self.ownerComp, parName + "x", data["x"])
         if "y" in data:
-            self.ownerComp.par[parName + "y"] = data["y"]
+            PAR_WRITES.write(self.ownerComp, parName + "y", data["y"])
         if "z" in data:
-            self.ownerComp.par[parName + "z"] = data["z"]
+            PAR_WRITES.write(self.ownerComp, parName + "z", data["z"])
         if "w" in data:
-            self.ownerComp.par[parName + "w"] = data["w"]
+            PAR_WRITES.write(self.ownerComp, parName + "w", data["w"])
 
 
 class RGBParShape(ParShape):
@@ -313,11 +402,11 @@ class RGBParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "r" in data:
-            self.ownerComp.par[parName + "r"] = data["r"]
+            PAR_WRITES.write(self.ownerComp, parName + "r", data["r"])
         if "g" in data:
-            self.ownerComp.par[parName + "g"] = data["g"]
+            PAR_WRITES.write(self.ownerComp, parName + "g", data["g"])
         if "b" in data:
-            self.ownerComp.par[parName + "b"] = data["b"]
+            PAR_WRITES.write(self.ownerComp, parName + "b", data["b"])
 
 
 class ColorParShape(ParShape):
@@ -360,13 +449,13 @@ class ColorParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "r" in data:
-            self.ownerComp.par[parName + "r"] = data["r"]
+            PAR_WRITES.write(self.ownerComp, parName + "r", data["r"])
         if "g" in data:
-            self.ownerComp.par[parName + "g"] = data["g"]
+            PAR_WRITES.write(self.ownerComp, parName + "g", data["g"])
         if "b" in data:
-            self.ownerComp.par[parName + "b"] = data["b"]
+            PAR_WRITES.write(self.ownerComp, parName + "b", data["b"])
         if "a" in data:
-            self.ownerComp.par[parName + "a"] = data["a"]
+            PAR_WRITES.write(self.ownerComp, parName + "a", data["a"])
 
 
 class UVParShape(ParShape):
@@ -390,9 +479,9 @@ class UVParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "u" in data:
-            self.ownerComp.par[parName + "u"] = data["u"]
+            PAR_WRITES.write(self.ownerComp, parName + "u", data["u"])
         if "v" in data:
-            self.ownerComp.par[parName + "v"] = data["v"]
+            PAR_WRITES.write(self.ownerComp, parName + "v", data["v"])
 
 
 class UVWParShape(ParShape):
@@ -433,11 +522,11 @@ class UVWParShape(ParShape):
     def setData(self, data: Dict[str, any]):
         parName = self.parGroup.name
         if "u" in data:
-            self.ownerComp.par[parName + "u"] = data["u"]
+            PAR_WRITES.write(self.ownerComp, parName + "u", data["u"])
         if "v" in data:
-            self.ownerComp.par[parName + "v"] = data["v"]
+            PAR_WRITES.write(self.ownerComp, parName + "v", data["v"])
         if "w" in data:
-            self.ownerComp.par[parName + "w"] = data["w"]
+            PAR_WRITES.write(self.ownerComp, parName + "w", data["w"])
 
 
 class MenuParShape(ParShape):
@@ -448,6 +537,12 @@ class MenuParShape(ParShape):
     def buildData(self) -> Dict[str, any]:
         return {"value": self.ownerComp.par[self.parGroup.name].eval()}
 
+    def schemaSignature(self) -> tuple:
+        return super().schemaSignature() + (
+            tuple(self.parGroup.menuNames[0]),
+            tuple(self.parGroup.menuLabels[0]),
+        )
+
     def buildSchemaProperties(self) -> Dict[str, any]:
         oneOf = []
         for i in range(len(self.parGroup.menuNames[0])):
@@ -461,7 +556,7 @@ class MenuParShape(ParShape):
 
     def setData(self, data: Dict[str, any]):
         if "value" in data:
-            self.ownerComp.par[self.parGroup.name] = data["value"]
+            PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 class StrMenuParShape(MenuParShape):
@@ -481,7 +576,7 @@ class FileParShape(ParShape):
 
     def setData(self, data: Dict[str, any]):
         if "value" in data:
-            self.ownerComp.par[self.parGroup.name] = data["value"]
+            PAR_WRITES.write(self.ownerComp, self.parGroup.name, data["value"])
 
 
 def buildShape(ownerComp: OP, parGroup: ParGroup) -> ParShape:
@@ -588,7 +683,7 @@ class SequenceParShape(ParShape):
 
     def _wrapSequenceMemberData(self, parGroup: ParGroup, value: any):
         shape = buildShape(self.ownerComp, parGroup)
-        schemaProperties = shape.buildSchemaProperties()
+        schemaProperties = shape.schemaProperties()
         if list(schemaProperties.keys()) == ["value"] and not isinstance(value, dict):
             return {"value": value}
         return value
@@ -618,6 +713,13 @@ class SequenceParShape(ParShape):
 
         return items
 
+    def schemaSignature(self) -> tuple:
+        members = []
+        for blockParGroup in self._getSchemaParGroups():
+            blockShape = buildShape(self.ownerComp, blockParGroup)
+            members.append((self._getSequenceMemberKey(blockParGroup), blockShape.schemaSignature()))
+        return (type(self).__name__, tuple(members))
+
     def buildSchemaProperties(self) -> Dict[str, any]:
         itemProperties = {}
         seenParGroups = set()
@@ -629,7 +731,7 @@ class SequenceParShape(ParShape):
             seenParGroups.add(memberKey)
             blockShape = buildShape(self.ownerComp, blockParGroup)
             itemProperties[memberKey] = self._unwrapSequenceMemberSchema(
-                blockShape.buildSchemaProperties()
+                blockShape.schemaProperties()
             )
 
         return {
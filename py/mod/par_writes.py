@@ -0,0 +1,85 @@
+from typing import Dict, Tuple
+
+from td import OP
+
+
+ParKey = Tuple[str, str]
+
+
+class ParWriteBuffer:
+	"""
+	Optional write-combining layer for par sets coming from actions. While
+	enabled, writes are recorded per (op path, par name) and only the last
+	value is applied when flush() runs once per frame, so a burst of actions
+	cooks the network once. Pulses are applied after all writes, so a
+	"pars updated" pulse always sees the values written alongside it.
+
+	Par names are checked when a write is buffered, so a bad name still fails
+	the action that made it. OPs deleted before the flush are skipped.
+	"""
+
+	def __init__(self):
+		self.enabled = False
+		self.writes: Dict[ParKey, Tuple[OP, str, any]] = {}
+		self.pulses: Dict[ParKey, Tuple[OP, str]] = {}
+		self.collapsed = 0
+
+	def write(self, ownerComp: OP, parName: str, value: any):
+		if not self.enabled:
+			ownerComp.par[parName] = value
+			return
+
+		self._check(ownerComp, parName)
+		key = (ownerComp.path, parName)
+		if key in self.writes:
+			self.collapsed += 1
+		self.writes[key] = (ownerComp, parName, value)
+
+	def pulse(self, ownerComp: OP, parName: str):
+		if not self.enabled:
+			ownerComp.par[parName].pulse()
+			return
+
+		self._check(ownerComp, parName)
+		# A par can only pulse once per frame, so repeats collapse too
+		key = (ownerComp.path, parName)
+		if key in self.pulses:
+			self.collapsed += 1
+		self.pulses[key] = (ownerComp, parName)
+
+	def _check(self, ownerComp: OP, parName: str):
+		if ownerComp.par[parName] is None:
+			raise Exception(f'No parameter {parName} on {ownerComp.path}')
+
+	@property
+	def pending(self) -> int:
+		return len(self.writes) + len(self.pulses)
+
+	def flush(self):
+		if len(self.writes) == 0 and len(self.pulses) == 0:
+			return
+
+		writes = self.writes
+		pulses = self.pulses
+		self.writes = {}
+		self.pulses = {}
+
+		for ownerComp, parName, value in writes.values():
+			if not ownerComp.valid:
+				continue
+			try:
+				ownerComp.par[parName] = value
+			except Exception as e:
+				# The par may have been removed since the write was queued, e.g. a shrunk sequence
+				op.RS_LOG.Warning(f"[ParWriteBuffer]: Could not set {ownerComp.path}.{parName}: {e}")
+
+		for ownerComp, parName in pulses.values():
+			if not ownerComp.valid:
+				continue
+			par = ownerComp.par[parName]
+			if par is None:
+				continue
+			par.pulse()
+
+
+PAR_WRITES = ParWriteBuffer()
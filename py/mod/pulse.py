@@ -0,0 +1,130 @@
+from typing import Callable, Dict, List, Tuple
+
+
+class PulseRateLimiter:
+	"""
+	Caps how often each emitter may pulse. Pulses that arrive before their slot
+	are parked, latest wins, and handed back by due() once the slot opens so
+	the final value is never lost. Per-key rates come from a source called on
+	every check, so an override changed at runtime applies to the next pulse.
+	"""
+
+	def __init__(self, defaultRate: float = 0):
+		self.defaultRate = defaultRate
+		self.rateSources: Dict[str, Callable[[], float | None]] = {}
+		self.lastSent: Dict[str, float] = {}
+		self.pending: Dict[str, Tuple[float, any]] = {}
+
+	def setRateSource(self, key: str, source: Callable[[], float | None] | None):
+		"""
+		Sets where the key's rate override is read from. The source returns None
+		to use the default rate.
+		"""
+		if source is None:
+			self.rateSources.pop(key, None)
+		else:
+			self.rateSources[key] = source
+
+	def clearRates(self):
+		self.rateSources.clear()
+
+	def reset(self):
+		self.lastSent.clear()
+		self.pending.clear()
+
+	def intervalFor(self, key: str) -> float:
+		source = self.rateSources.get(key, None)
+		rate = source() if source is not None else None
+		if rate is None:
+			rate = self.defaultRate
+		if rate is None or rate <= 0:
+			return 0
+		return 1.0 / rate
+
+	def offer(self, key: str, now: float, payload: any = None) -> bool:
+		"""
+		Returns True if the pulse may be sent now. Otherwise the payload is parked
+		until the next allowed slot, replacing anything already parked for the key.
+		"""
+		interval = self.intervalFor(key)
+		if interval <= 0:
+			self.pending.pop(key, None)
+			return True
+
+		last = self.lastSent.get(key, None)
+		if last is None or now - last >= interval:
+			self.lastSent[key] = now
+			self.pending.pop(key, None)
+			return True
+
+		self.pending[key] = (last + interval, payload)
+		return False
+
+	def due(self, now: float) -> List[Tuple[str, any]]:
+		if len(self.pending) == 0:
+			return []
+
+		ready = [(key, payload) for key, (dueAt, payload) in self.pending.items() if dueAt <= now]
+		for key, _ in ready:
+			del self.pending[key]
+			self.lastSent[key] = now
+		return ready
+
+
+def freezePayload(value: any) -> tuple:
+	"""
+	Immutable copy of a pulse payload for equality checks: dicts, lists and
+	scalars are folded into nested tuples, tagged so {} and [] with the same
+	contents differ.
+	"""
+	return _freezeValue(value)
+
+
+def _freezeValue(value: any) -> any:
+	if isinstance(value, dict):
+		return ('d',) + tuple((key, _freezeValue(item)) for key, item in value.items())
+	if isinstance(value, (list, tuple)):
+		return ('l',) + tuple(_freezeValue(item) for item in value)
+	try:
+		hash(value)
+	except TypeError:
+		return ('r', repr(value))
+	return (type(value).__name__, value)
+
+
+class PulseDeduper:
+	"""
+	Remembers a frozen copy of the last payload sent per emitter id and drops
+	pulses equal to it. Momentary emitters (pulse pars) only
+	dedupe within a frame, since every press is a real event.
+	"""
+
+	def __init__(self):
+		self.lastSent: Dict[str, tuple] = {}
+		self.momentaryKeys: set = set()
+		self.sent = 0
+		self.suppressed = 0
+
+	def setMomentary(self, key: str, momentary: bool):
+		if momentary:
+			self.momentaryKeys.add(key)
+		else:
+			self.momentaryKeys.discard(key)
+
+	def accept(self, key: str, data: any, force: bool = False) -> bool:
+		# Compared by value, so payloads whose hashes collide are still told apart
+		frozen = freezePayload(data)
+		if not force and self.lastSent.get(key, None) == frozen:
+			self.suppressed += 1
+			return False
+
+		self.lastSent[key] = frozen
+		self.sent += 1
+		return True
+
+	def endFrame(self):
+		for key in self.momentaryKeys:
+			self.lastSent.pop(key, None)
+
+	def reset(self):
+		self.lastSent.clear()
@@ -0,0 +1,47 @@
+from typing import Dict, Hashable, List
+
+
+class GenerationRegistry(dict):
+	"""
+	Dict that remembers the build generation each key was last set in.
+
+	A project build calls advance(), re-registers everything it still has,
+	then sweep() drops the keys it did not touch. Lookups are plain dict
+	lookups, so hot paths pay nothing for the bookkeeping.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.generation = 0
+		self.generations: Dict[Hashable, int] = {}
+		self.swept = 0
+
+	def __setitem__(self, key: Hashable, value: any):
+		super().__setitem__(key, value)
+		self.generations[key] = self.generation
+
+	def __delitem__(self, key: Hashable):
+		super().__delitem__(key)
+		self.generations.pop(key, None)
+
+	def pop(self, key: Hashable, *default):
+		self.generations.pop(key, None)
+		return super().pop(key, *default)
+
+	def clear(self):
+		super().clear()
+		self.generations.clear()
+
+	def advance(self) -> int:
+		self.generation += 1
+		return self.generation
+
+	def sweep(self) -> List[Hashable]:
+		"""
+		Removes keys that were not set since the last advance(). Returns them.
+		"""
+		stale = [key for key, generation in self.generations.items() if generation < self.generation]
+		for key in stale:
+			del self[key]
+		self.swept += len(stale)
+		return stale
@@ -0,0 +1,131 @@
+import time
+from typing import Dict, List
+
+from myko import QueryResponse
+
+
+class MirrorUpdate:
+	__slots__ = ('upserted', 'deleted', 'gap', 'stale')
+
+	def __init__(self, upserted: List[str] | None = None, deleted: List[str] | None = None, gap: bool = False, stale: bool = False):
+		self.upserted = upserted or []
+		self.deleted = deleted or []
+		# A response was missed; the mirror must be rebuilt by re-querying
+		self.gap = gap
+		# The response was a duplicate or arrived after a newer one and was ignored
+		self.stale = stale
+
+
+class RemoteMirror:
+	"""
+	Local copy of the items a live query reports, keyed by item id.
+
+	The first response on a tx is taken as a full snapshot. Later responses
+	are applied incrementally in sequence order: duplicates and older
+	sequences are ignored, and a skipped sequence is reported as a gap so
+	the owner can re-query. Until the re-query's snapshot arrives the mirror
+	stays requeryPending and later responses on the old tx are gaps too.
+	Responses without a sequence are applied as they come.
+	"""
+
+	# Minimum seconds between gap-triggered re-queries
+	REQUERY_INTERVAL = 5.0
+
+	def __init__(self, itemType: str):
+		self.itemType = itemType
+		self.items: Dict[str, dict] = {}
+		self.tx: str | None = None
+		self.sequence: int | None = None
+		self.totalCount: int | None = None
+		self.gaps = 0
+		self.requeryPending = False
+		self.lastRequeryAt: float | None = None
+
+	def __len__(self) -> int:
+		return len(self.items)
+
+	def __contains__(self, itemId: str) -> bool:
+		return itemId in self.items
+
+	def reset(self):
+		self.items.clear()
+		self.tx = None
+		self.sequence = None
+		self.totalCount = None
+		self.requeryPending = False
+
+	def shouldRequery(self, now: float | None = None) -> bool:
+		"""
+		True if a re-query is pending and the last one was long enough ago.
+		Call it again later, e.g. every tick, while requeryPending stays set.
+		"""
+		if not self.requeryPending:
+			return False
+		now = time.monotonic() if now is None else now
+		if self.lastRequeryAt is not None and now - self.lastRequeryAt < self.REQUERY_INTERVAL:
+			return False
+		self.lastRequeryAt = now
+		return True
+
+	def apply(self, response: QueryResponse) -> MirrorUpdate:
+		snapshot = response.tx != self.tx
+		if snapshot:
+			self.reset()
+			self.tx = response.tx
+
+		sequence = response.sequence or None
+		if not snapshot and sequence is not None and self.sequence is not None:
+			if sequence <= self.sequence:
+				return MirrorUpdate(stale=True)
+			if self.requeryPending or sequence > self.sequence + 1:
+				if not self.requeryPending:
+					self.gaps += 1
+					self.requeryPending = True
+				return MirrorUpdate(gap=True)
+
+		if sequence is not None:
+			self.sequence = sequence
+		if response.totalCount is not None:
+			self.totalCount = response.totalCount
+
+		update = MirrorUpdate()
+		for wrapped in response.upserts:
+			self._upsert(wrapped.item, update)
+		for itemId in response.deletes:
+			self._delete(itemId, update)
+
+		for change in response.changes:
+			kind = (change.kind or '').lower()
+			if kind in ('reset', 'clear', 'snapshot'):
+				for itemId in list(self.items.keys()):
+					self._delete(itemId, update)
+				if change.item is not None:
+					self._upsert(change.item, update)
+			elif 'delete' in kind or 'remove' in kind:
+				if change.id is not None:
+					self._delete(change.id, update)
+				for itemId in change.ids:
+					self._delete(itemId, update)
+			elif change.item is not None:
+				self._upsert(change.item, update)
+
+			if change.totalCount is not None:
+				self.totalCount = change.totalCount
+
+		return update
+
+	def _upsert(self, item: dict | None, update: MirrorUpdate):
+		if not isinstance(item, dict):
+			return
+		# Changes may carry the same {itemType, item} wrapper as upserts
+		if 'itemType' in item and isinstance(item.get('item', None), dict):
+			item = item['item']
+		itemId = item.get('id', None)
+		if itemId is None:
+			return
+		self.items[itemId] = item
+		update.upserted.append(itemId)
+
+	def _delete(self, itemId: str, update: MirrorUpdate):
+		if self.items.pop(itemId, None) is not None:
+			update.deleted.append(itemId)
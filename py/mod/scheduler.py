@@ -0,0 +1,125 @@
+import time
+from typing import Callable, Dict, Generator, List, Tuple
+
+
+# Jobs yield (stage, done, total) between steps
+JobSteps = Generator[Tuple[str, int, int], None, None]
+
+
+class SchedulerJob:
+	def __init__(self, name: str, steps: JobSteps, onComplete: Callable[[], None] | None = None):
+		self.name = name
+		self.steps = steps
+		self.onComplete = onComplete
+		self.stage = 'queued'
+		self.done = 0
+		self.total = 0
+		self.startedAt = time.perf_counter()
+		self.frames = 0
+
+	@property
+	def progress(self) -> float:
+		if self.total <= 0:
+			return 0.0
+		return min(self.done / self.total, 1.0)
+
+
+class FrameScheduler:
+	"""
+	Runs generator-based jobs cooperatively. tick() resumes queued jobs until the
+	per-frame budget is spent and leaves the rest for later frames. A budget of
+	0 runs every job to completion as soon as it is submitted.
+	"""
+
+	def __init__(self, budgetMs: float = 4.0):
+		self.budgetMs = budgetMs
+		self.jobs: Dict[str, SchedulerJob] = {}
+		self.lastCompleted: str | None = None
+
+	@property
+	def busy(self) -> bool:
+		return len(self.jobs) > 0
+
+	def submit(self, name: str, steps: JobSteps, onComplete: Callable[[], None] | None = None) -> SchedulerJob:
+		"""
+		Queues a job, replacing any unfinished job with the same name.
+		"""
+		self.cancel(name)
+		job = SchedulerJob(name, steps, onComplete)
+		self.jobs[name] = job
+
+		if self.budgetMs <= 0:
+			self._run(job, deadline=None)
+		return job
+
+	def cancel(self, name: str):
+		job = self.jobs.pop(name, None)
+		if job is not None:
+			job.steps.close()
+
+	def flush(self):
+		"""
+		Runs every queued job to completion, e.g. when nothing will call tick().
+		"""
+		for job in list(self.jobs.values()):
+			if self.jobs.get(job.name, None) is job:
+				self._run(job, deadline=None)
+
+	def cancelAll(self):
+		for name in list(self.jobs.keys()):
+			self.cancel(name)
+
+	def tick(self):
+		if len(self.jobs) == 0:
+			return
+
+		deadline = time.perf_counter() + self.budgetMs / 1000.0
+		for job in list(self.jobs.values()):
+			if self.jobs.get(job.name, None) is not job:
+				continue
+			job.frames += 1
+			if not self._run(job, deadline):
+				return
+
+	def _run(self, job: SchedulerJob, deadline: float | None) -> bool:
+		"""
+		Advances a job until it finishes or the deadline passes.
+		Returns True if the job finished.
+		"""
+		while deadline is None or time.perf_counter() < deadline:
+			try:
+				job.stage, job.done, job.total = next(job.steps)
+			except StopIteration:
+				if self.jobs.get(job.name, None) is job:
+					del self.jobs[job.name]
+				self.lastCompleted = job.name
+				if job.onComplete is not None:
+					job.onComplete()
+				return True
+			except Exception:
+				# A failed job must not be resumed again next frame
+				if self.jobs.get(job.name, None) is job:
+					del self.jobs[job.name]
+				raise
+		return False
+
+	def describe(self) -> Tuple[str, float]:
+		"""
+		Returns a short state string and the progress of the oldest running job.
+		"""
+		jobs: List[SchedulerJob] = list(self.jobs.values())
+		if len(jobs) == 0:
+			return 'idle', 1.0
+		job = jobs[0]
+		return f"{job.name}: {job.stage} {job.done}/{job.total}", job.progress
+
+
+def runSteps(steps: Generator) -> any:
+	"""
+	Drains a job synchronously and returns the generator's return value.
+	"""
+	while True:
+		try:
+			next(steps)
+		except StopIteration as done:
+			return done.value
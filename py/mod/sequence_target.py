@@ -36,7 +36,7 @@ class SequenceTarget(TouchTarget):
         )
 
     def getActions(self):
-        schema = self.parShape.buildSchemaProperties()
+        schema = self.parShape.schemaProperties()
 
         def handleSetAction(action: Action, data):
             return self.parShape.setData(data)
@@ -51,7 +51,7 @@ class SequenceTarget(TouchTarget):
         )
 
         def handleResendAction(action: Action, data):
-            CLIENT.pulseEmitter(f"{self.id}:updated", self.parShape.buildData())
+            CLIENT.pulseEmitter(f"{self.id}:updated", self.parShape.buildData(), force=True)
             return
 
         resendAction = Action(
@@ -73,7 +73,7 @@ class SequenceTarget(TouchTarget):
         return list(dict.fromkeys(changeKeys))
 
     def getEmitters(self):
-        schema = self.parShape.buildSchemaProperties()
+        schema = self.parShape.schemaProperties()
 
         setEmitter = Emitter(
             id=f"{self.id}:updated",
@@ -0,0 +1,103 @@
+import time
+from typing import Callable, Dict, Hashable, List
+
+
+QUERY = 'query'
+REPORT = 'report'
+
+
+class Subscription:
+	__slots__ = ('kind', 'key', 'tx', 'handler', 'onError', 'createdAt', 'responses')
+
+	def __init__(
+		self,
+		kind: str,
+		key: Hashable,
+		tx: str,
+		handler: Callable[[any], None],
+		onError: Callable[[any], None] | None,
+		createdAt: float,
+	):
+		self.kind = kind
+		self.key = key
+		self.tx = tx
+		self.handler = handler
+		self.onError = onError
+		self.createdAt = createdAt
+		self.responses = 0
+
+
+class SubscriptionManager:
+	"""
+	Owns the tx handlers for queries and reports.
+
+	Queries are live: the server keeps pushing responses for their tx until
+	the socket drops. Re-issuing a query with the same key, e.g. after a
+	reconnect, replaces the old subscription instead of stacking handlers.
+	Reports answer once and are closed on their response or error, or
+	expired if no answer arrives within reportTimeout seconds.
+	"""
+
+	def __init__(self, reportTimeout: float = 30.0):
+		self.reportTimeout = reportTimeout
+		self.byTx: Dict[str, Subscription] = {}
+		self.byKey: Dict[Hashable, Subscription] = {}
+		self.expired = 0
+
+	def open(
+		self,
+		kind: str,
+		tx: str,
+		handler: Callable[[any], None],
+		key: Hashable | None = None,
+		onError: Callable[[any], None] | None = None,
+	) -> Subscription | None:
+		"""
+		Registers a subscription. Returns the live subscription it replaced, if any.
+		"""
+		replaced = None
+		if key is not None:
+			replaced = self.byKey.get(key, None)
+			if replaced is not None:
+				self.close(replaced.tx)
+
+		subscription = Subscription(kind, key, tx, handler, onError, time.perf_counter())
+		self.byTx[tx] = subscription
+		if key is not None:
+			self.byKey[key] = subscription
+		return replaced
+
+	def get(self, tx: str) -> Subscription | None:
+		return self.byTx.get(tx, None)
+
+	def close(self, tx: str) -> Subscription | None:
+		subscription = self.byTx.pop(tx, None)
+		if subscription is None:
+			return None
+		if subscription.key is not None and self.byKey.get(subscription.key, None) is subscription:
+			del self.byKey[subscription.key]
+		return subscription
+
+	def expire(self, now: float | None = None) -> List[Subscription]:
+		"""
+		Closes reports that never got an answer.
+		"""
+		now = time.perf_counter() if now is None else now
+		stale = [
+			subscription for subscription in self.byTx.values()
+			if subscription.kind == REPORT and now - subscription.createdAt >= self.reportTimeout
+		]
+		for subscription in stale:
+			self.close(subscription.tx)
+		self.expired += len(stale)
+		return stale
+
+	def clear(self):
+		"""
+		Drops every subscription, e.g. when the socket drops and the server forgets them.
+		"""
+		self.byTx.clear()
+		self.byKey.clear()
+
+	def count(self, kind: str) -> int:
+		return sum(1 for subscription in self.byTx.values() if subscription.kind == kind)
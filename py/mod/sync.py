@@ -0,0 +1,97 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from exec import Status
+from myko import MItem
+
+
+SyncKey = Tuple[str, str]
+
+
+def hashItem(item: MItem | dict) -> str:
+	data = item if isinstance(item, dict) else item.to_wire()
+	encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+	return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SyncDiff:
+	def __init__(
+		self,
+		changed: List[MItem],
+		removed: List[SyncKey],
+		hashes: Dict[SyncKey, str],
+		statuses: Dict[str, Status],
+	):
+		self.changed = changed
+		self.removed = removed
+		self.hashes = hashes
+		self.statuses = statuses
+		self.itemCache: Dict[int, Tuple[MItem, str]] = {}
+
+	def isEmpty(self) -> bool:
+		return len(self.changed) == 0 and len(self.removed) == 0 and len(self.statuses) == 0
+
+
+class ProjectSync:
+	"""
+	Remembers a content hash for every item from the last successful sync so
+	only new or changed items are sent, plus DEL events for items that are gone.
+
+	Hashes are also remembered per item object, so items reused unchanged from
+	the previous refresh are not serialized again. Items must not be mutated
+	after they are first staged.
+	"""
+
+	def __init__(self):
+		self.itemHashes: Dict[SyncKey, str] = {}
+		self.targetStatuses: Dict[str, Status] = {}
+		self.itemCache: Dict[int, Tuple[MItem, str]] = {}
+
+	def reset(self):
+		"""
+		Forget everything that was synced, e.g. after the socket drops.
+		Cleared in place since RshipExt aliases targetStatuses.
+		"""
+		self.itemHashes.clear()
+		self.targetStatuses.clear()
+		self.itemCache.clear()
+
+	def diff(self, items: List[MItem], statuses: Dict[str, Status] | None = None) -> SyncDiff:
+		diff = self.begin()
+		for item in items:
+			self.stage(diff, item)
+		self.finish(diff, statuses)
+		return diff
+
+	def begin(self) -> SyncDiff:
+		"""
+		Starts an incremental diff; stage() items into it, then finish() it.
+		"""
+		return SyncDiff([], [], {}, {})
+
+	def stage(self, diff: SyncDiff, item: MItem):
+		key = (type(item).__name__, item.id)
+		cached = self.itemCache.get(id(item), None)
+		if cached is not None and cached[0] is item:
+			itemHash = cached[1]
+		else:
+			itemHash = hashItem(item)
+		diff.itemCache[id(item)] = (item, itemHash)
+		diff.hashes[key] = itemHash
+		if self.itemHashes.get(key, None) != itemHash:
+			diff.changed.append(item)
+
+	def finish(self, diff: SyncDiff, statuses: Dict[str, Status] | None = None):
+		diff.removed = [key for key in self.itemHashes.keys() if key not in diff.hashes]
+		# Hashes depend only on item contents, so they are kept even if the send fails
+		self.itemCache = diff.itemCache
+
+		for targetId, status in (statuses or {}).items():
+			if self.targetStatuses.get(targetId, None) != status:
+				diff.statuses[targetId] = status
+
+	def commit(self, diff: SyncDiff):
+		self.itemHashes.clear()
+		self.itemHashes.update(diff.hashes)
+		self.targetStatuses.update(diff.statuses)
@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, Dict, Tuple
+
+
+# Phases in pipeline order. Spans may nest: schema time is also counted in
+# targets or children, whichever built the shape.
+PHASES = ('cook', 'targets', 'children', 'schema', 'diff', 'events', 'encode', 'send')
+
+NO_SPAN = nullcontext()
+
+
+class _Span:
+	__slots__ = ('timer', 'name', 'start')
+
+	def __init__(self, timer: "PhaseTimer", name: str):
+		self.timer = timer
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.timer.add(self.name, time.perf_counter() - self.start)
+		return False
+
+
+class PhaseTimer:
+	"""
+	Times the phases of a project refresh. A refresh runs across frames, so
+	spans only cover work done inside a frame and add up per phase until
+	endRun() moves the totals into a rolling history. Spans only record
+	between begin() and endRun() or cancel(), so work done between refreshes
+	is left out. Otherwise span() hands back a shared no-op context. begin()
+	starts a new run, dropping what a superseded one had timed so far.
+	"""
+
+	def __init__(self, history: int = 120):
+		self.enabled = False
+		# Set while a refresh is running
+		self.active = False
+		self.history = history
+		self.current: Dict[str, float] = {}
+		self.samples: Dict[str, Deque[float]] = {}
+		self.runs = 0
+
+	def span(self, name: str):
+		if not (self.enabled and self.active):
+			return NO_SPAN
+		return _Span(self, name)
+
+	def begin(self):
+		self.active = True
+		self.current.clear()
+
+	def cancel(self):
+		"""
+		Drops the partial totals of a refresh that will not finish.
+		"""
+		self.active = False
+		self.current.clear()
+
+	def add(self, name: str, seconds: float):
+		self.current[name] = self.current.get(name, 0.0) + seconds
+
+	def endRun(self) -> Dict[str, float] | None:
+		"""
+		Records the run that just finished. Returns its per-phase times in ms,
+		or None if nothing was timed.
+		"""
+		self.active = False
+		if len(self.current) == 0:
+			return None
+
+		run = {name: seconds * 1000.0 for name, seconds in self.current.items()}
+		self.current.clear()
+		for name, ms in run.items():
+			samples = self.samples.get(name, None)
+			if samples is None:
+				samples = self.samples[name] = deque(maxlen=self.history)
+			samples.append(ms)
+		self.runs += 1
+		return run
+
+	def stats(self, name: str) -> Tuple[float, float, float]:
+		"""
+		Returns (last, mean, p95) in ms for a phase, zeros if it was never timed.
+		"""
+		samples = self.samples.get(name, None)
+		if not samples:
+			return 0.0, 0.0, 0.0
+		ordered = sorted(samples)
+		p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+		return samples[-1], sum(samples) / len(samples), p95
+
+	def clear(self):
+		self.active = False
+		self.current.clear()
+		self.samples.clear()
+		self.runs = 0
+
+
+PHASE_TIMER = PhaseTimer()
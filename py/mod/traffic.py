@@ -0,0 +1,106 @@
+import time
+from typing import Dict, List, Tuple
+
+
+# Events seen after this many distinct kinds are metered together under OTHER_KIND
+MAX_KINDS = 64
+OTHER_KIND = 'other'
+TOTAL_KIND = 'total'
+
+# (kind, messages per second, bytes per second, largest message in bytes)
+TrafficRate = Tuple[str, float, float, int]
+
+
+def messageBytes(message: str | bytes) -> int:
+	"""
+	Wire size of a message. Text frames are UTF-8, and OP and par names can
+	make them non-ASCII, so only ASCII text is measured by its length.
+	"""
+	if isinstance(message, (bytes, bytearray)) or message.isascii():
+		return len(message)
+	return len(message.encode('utf-8'))
+
+
+class TrafficMeter:
+	"""
+	Messages, bytes and largest message over a sliding window of one-second
+	buckets. The buckets are fixed-size ring buffers allocated up front, so
+	recording a message only updates a few list slots.
+	"""
+
+	__slots__ = ('window', 'seconds', 'messages', 'bytes', 'largest')
+
+	def __init__(self, window: int = 10):
+		self.window = window
+		self.seconds = [-1] * window
+		self.messages = [0] * window
+		self.bytes = [0] * window
+		self.largest = [0] * window
+
+	def record(self, size: int, second: int):
+		slot = second % self.window
+		if self.seconds[slot] != second:
+			self.seconds[slot] = second
+			self.messages[slot] = 0
+			self.bytes[slot] = 0
+			self.largest[slot] = 0
+		self.messages[slot] += 1
+		self.bytes[slot] += size
+		if size > self.largest[slot]:
+			self.largest[slot] = size
+
+	def rate(self, second: int) -> Tuple[float, float, int]:
+		"""
+		Returns (messages/sec, bytes/sec, largest) over the full seconds before
+		second. The current second is still filling, so it is left out.
+		"""
+		span = self.window - 1
+		oldest = second - span
+		messages = 0
+		total = 0
+		largest = 0
+		for slot in range(self.window):
+			stamp = self.seconds[slot]
+			if oldest <= stamp < second:
+				messages += self.messages[slot]
+				total += self.bytes[slot]
+				largest = max(largest, self.largest[slot])
+		return messages / span, total / span, largest
+
+
+class TrafficMeters:
+	"""
+	One TrafficMeter per message kind, e.g. the event name, plus a total.
+	Meters are created the first time a kind is seen and then reused.
+	"""
+
+	def __init__(self, window: int = 10):
+		self.window = max(2, window)
+		self.meters: Dict[str, TrafficMeter] = {TOTAL_KIND: TrafficMeter(self.window)}
+
+	def record(self, kind: str | None, size: int, now: float | None = None):
+		second = int(time.monotonic() if now is None else now)
+		meter = self.meters.get(kind, None)
+		if meter is None:
+			if kind is not None and len(self.meters) < MAX_KINDS:
+				meter = self.meters[kind] = TrafficMeter(self.window)
+			else:
+				meter = self.meters.get(OTHER_KIND, None)
+				if meter is None:
+					meter = self.meters[OTHER_KIND] = TrafficMeter(self.window)
+		meter.record(size, second)
+		if meter is not self.meters[TOTAL_KIND]:
+			self.meters[TOTAL_KIND].record(size, second)
+
+	def rate(self, kind: str = TOTAL_KIND, now: float | None = None) -> Tuple[float, float, int]:
+		meter = self.meters.get(kind, None)
+		if meter is None:
+			return 0.0, 0.0, 0
+		return meter.rate(int(time.monotonic() if now is None else now))
+
+	def rates(self, now: float | None = None) -> List[TrafficRate]:
+		second = int(time.monotonic() if now is None else now)
+		return [(kind, *meter.rate(second)) for kind, meter in self.meters.items()]
+
+	def clear(self):
+		self.meters = {TOTAL_KIND: TrafficMeter(self.window)}
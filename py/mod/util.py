@@ -18,4 +18,5 @@ RS_TARGET_INFO_PAGE = "Rship Target Config"
 RS_BUNDLE_COMPLETE_PAR = "Rshipparsupdated"
 RS_TARGET_ID_PAR = "Rshiptargetid"
 RS_TARGET_ID_STORAGE_KEY = 'rs_target_id'
+RS_EMITTER_MAX_RATE_PAR = "Rshipemittermaxrate"
 
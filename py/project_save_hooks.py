@@ -16,9 +16,11 @@ def onExit():
 	return
 
 def onFrameStart(frame):
+	me.ext.RshipExt.OnFrameStart(frame)
 	return
 
 def onFrameEnd(frame):
+	me.ext.RshipExt.OnFrameEnd(frame)
 	return
 
 def onPlayStateChange(state):
@@ -12,7 +12,7 @@ def onReceiveText(dat, rowIndex, message):
 	return
 
 def onReceiveBinary(dat, contents):
-	op.RS_LOG.Debug('[Rship WS]: Ignoring binary frame; TouchDesigner executor is JSON-only')
+	me.ext.RshipExt.OnRshipReceiveBinary(contents)
 	return
 
 def onReceivePing(dat, contents):
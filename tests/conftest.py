@@ -0,0 +1,17 @@
+"""
+Runs the modules in py/mod outside TouchDesigner. Only the op.RS_LOG global
+they log through is provided.
+"""
+import builtins
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py', 'mod'))
+
+
+def _ignore(*args, **kwargs):
+	return None
+
+
+builtins.op = SimpleNamespace(RS_LOG=SimpleNamespace(Info=_ignore, Debug=_ignore, Warning=_ignore, Error=_ignore))
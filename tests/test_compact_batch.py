@@ -0,0 +1,67 @@
+from exec import Action, ExecClient
+
+
+def makeClient(actions):
+	client = ExecClient()
+	client.responses = []
+	client.errors = []
+	client.sendCommandResponse = lambda tx, response=None, latency=None: client.responses.append((tx, response))
+	client.sendCommandError = lambda tx, commandId, message: client.errors.append((tx, message))
+	for action in actions:
+		client.actions[action.id] = action
+		client.handlers[action.id] = action.handler
+	return client
+
+
+def compactBatch(actionId, payloads, assignments):
+	return {
+		'tx': 'batch',
+		'groups': [{
+			'actionId': actionId,
+			'payloads': payloads,
+			'assignments': [{'targetId': targetId, 'payloadIndex': index} for targetId, index in assignments],
+		}],
+	}
+
+
+def test_mergeable_payloads_are_merged_per_target_in_assignment_order():
+	applied = []
+	action = Action('t:bulk_set', 'Bulk Set', 't', 'show', None, lambda a, data: applied.append(dict(data)), mergeable=True)
+	client = makeClient([action])
+
+	client.handleCompactBatchTargetAction(
+		'CompactBatchTargetAction',
+		compactBatch('t:bulk_set', [{'A': 1}, {'B': 2}, {'A': 3}], [('t', 0), ('t', 1), ('t', 2)]),
+	)
+
+	assert applied == [{'A': 3, 'B': 2}]
+	assert client.errors == []
+
+
+def test_shared_payload_is_passed_once_per_target_without_copying():
+	applied = []
+	action = Action('t:bulk_set', 'Bulk Set', 't', 'show', None, lambda a, data: applied.append(data), mergeable=True)
+	client = makeClient([action])
+	payload = {'A': 1}
+
+	client.handleCompactBatchTargetAction(
+		'CompactBatchTargetAction',
+		compactBatch('t:bulk_set', [payload], [('t', 0), ('u', 0), ('t', 0)]),
+	)
+
+	assert len(applied) == 2
+	assert all(data is payload for data in applied)
+
+
+def test_non_mergeable_actions_run_every_assignment_in_order():
+	applied = []
+	action = Action('t:set', 'Set', 't', 'show', None, lambda a, data: applied.append(data['n']))
+	client = makeClient([action])
+
+	client.handleCompactBatchTargetAction(
+		'CompactBatchTargetAction',
+		compactBatch('t:set', [{'n': 0}, {'n': 1}], [('t', 1), ('u', 0), ('t', 0), ('t', 1)]),
+	)
+
+	# Pulses and other triggers must fire once per assignment, in order per target
+	assert applied == [1, 0, 1, 0]
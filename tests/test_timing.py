@@ -0,0 +1,31 @@
+from timing import PhaseTimer
+
+
+def test_superseded_refresh_is_not_added_to_the_next_run():
+	timer = PhaseTimer()
+	timer.enabled = True
+
+	timer.begin()
+	timer.add('targets', 1.0)
+	# A new refresh replaces the first one before it finished
+	timer.begin()
+	timer.add('targets', 0.25)
+
+	assert timer.endRun() == {'targets': 250.0}
+	assert timer.runs == 1
+
+
+def test_spans_only_record_while_a_run_is_active():
+	timer = PhaseTimer()
+	timer.enabled = True
+
+	with timer.span('send'):
+		pass
+	assert timer.current == {}
+
+	timer.begin()
+	with timer.span('send'):
+		pass
+	timer.cancel()
+	assert timer.current == {}
+	assert timer.endRun() is None